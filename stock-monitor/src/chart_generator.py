@@ -544,8 +544,9 @@ class ChartGenerator:
             self.logger.info(f"[{market_name}] 饼图使用A股转换因子: 1e8 (分->亿元)")
         else:
             # 美股/港股: 根据数值范围确定转换因子
-            non_zero_vals = df[inflow_col][df[inflow_col] != 0].abs()
-            median_val = non_zero_vals.median() if len(non_zero_vals) > 0 else df[inflow_col].abs().median()
+            arr = df[inflow_col].to_numpy(dtype='float64', na_value=0.0)
+            non_zero_vals = np.abs(arr[arr != 0])
+            median_val = np.median(non_zero_vals) if non_zero_vals.size > 0 else 0.0
             
             # 美股/港股的 estimated_inflow = price_change * volume
             # 典型值范围：几百万到几千万美元/港币
@@ -676,7 +677,8 @@ class ChartGenerator:
         if not inflow_col:
             return None
 
-        df = df.copy()
+        # 一次性取出连续float64数组，NaN按0处理（与pandas求和跳过NaN等价）
+        arr = df[inflow_col].to_numpy(dtype='float64', na_value=0.0)
         
         # 判断市场类型并确定转换因子和标签
         # A股: 原始数据是分(从akshare获取)，需要除以 1e8 得到亿元
@@ -688,8 +690,8 @@ class ChartGenerator:
             self.logger.info(f"[{market_name}] 摘要图使用A股转换因子: 1e8 (分->亿元)")
         else:
             # 美股/港股: 根据数值范围确定转换因子
-            non_zero_vals = df[inflow_col][df[inflow_col] != 0].abs()
-            median_val = non_zero_vals.median() if len(non_zero_vals) > 0 else df[inflow_col].abs().median()
+            non_zero_vals = np.abs(arr[arr != 0])
+            median_val = np.median(non_zero_vals) if non_zero_vals.size > 0 else 0.0
             
             # 美股/港股的 estimated_inflow = price_change * volume
             if median_val < 1e8:  # 小于1亿
@@ -701,15 +703,17 @@ class ChartGenerator:
                 unit_label = "亿元"
                 self.logger.info(f"[{market_name}] 摘要图中位数={median_val:.0f}, 使用转换因子: 1e8 (美元->亿元)")
             
-        df['inflow_yi'] = df[inflow_col] / divisor
+        inflow_yi = arr / divisor
 
-        # 统计
-        total_inflow = df[df['inflow_yi'] > 0]['inflow_yi'].sum()
-        total_outflow = df[df['inflow_yi'] < 0]['inflow_yi'].sum()
+        # 统计，正负掩码各计算一次
+        pos = inflow_yi > 0
+        neg = inflow_yi < 0
+        total_inflow = inflow_yi[pos].sum()
+        total_outflow = inflow_yi[neg].sum()
         net_flow = total_inflow + total_outflow
 
-        inflow_sectors = (df['inflow_yi'] > 0).sum()
-        outflow_sectors = (df['inflow_yi'] < 0).sum()
+        inflow_sectors = int(pos.sum())
+        outflow_sectors = int(neg.sum())
 
         # 创建图表
         fig, axes = plt.subplots(1, 2, figsize=(14, 6))
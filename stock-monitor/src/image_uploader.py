@@ -1,12 +1,15 @@
 """图床上传模块 - 上传图表到Imgur获取公开URL"""
 import logging
-import base64
+import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List
+import aiohttp
 import requests
 
 logger = logging.getLogger(__name__)
 
+IMGUR_UPLOAD_URL = "https://api.imgur.com/3/image"
+
 
 class ImageUploader:
     """图片上传器类 - 支持Imgur等图床"""
@@ -19,6 +22,12 @@ class ImageUploader:
             imgur_client_id: Imgur API Client ID (可选)
         """
         self.imgur_client_id = imgur_client_id
+        self._imgur_url = IMGUR_UPLOAD_URL
+        self._imgur_headers = (
+            {"Authorization": f"Client-ID {imgur_client_id}"} if imgur_client_id else None
+        )
+        self._session = requests.Session()
+        self._async_session: Optional[aiohttp.ClientSession] = None
         self.logger = logging.getLogger(self.__class__.__name__)
     
     def upload_to_imgur(self, image_path: str) -> Optional[str]:
@@ -35,26 +44,78 @@ class ImageUploader:
             self.logger.warning("未配置Imgur Client ID，跳过上传")
             return None
         
+        self.logger.info(f"正在上传图片到Imgur: {image_path}")
         try:
-            # 读取图片文件
-            image_file = Path(image_path)
-            if not image_file.exists():
-                self.logger.error(f"图片文件不存在: {image_path}")
+            # 直接以文件对象做multipart上传，不再预先检查存在性和base64编码
+            with open(image_path, 'rb') as f:
+                response = self._session.post(
+                    self._imgur_url,
+                    headers=self._imgur_headers,
+                    files={"image": (Path(image_path).name, f, "image/png")},
+                    timeout=60
+                )
+            if not response.ok:
+                self.logger.error(
+                    f"Imgur上传失败: HTTP {response.status_code} {response.text[:200]}"
+                )
                 return None
+            data = response.json()
+        except FileNotFoundError:
+            self.logger.error(f"图片文件不存在: {image_path}")
+            return None
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"上传请求失败: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"上传图片失败: {str(e)}")
+            return None
+        
+        if data.get("success"):
+            image_url = data["data"]["link"]
+            self.logger.info(f"图片上传成功: {image_url}")
+            return image_url
+        
+        self.logger.error(f"Imgur上传失败: {data}")
+        return None
+    
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        """获取（懒加载）异步HTTP会话"""
+        if self._async_session is None or self._async_session.closed:
+            self._async_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+        return self._async_session
+
+    async def upload_to_imgur_async(self, image_path: str) -> Optional[str]:
+        """
+        异步上传图片到Imgur
+        
+        Args:
+            image_path: 本地图片路径
             
-            with open(image_file, 'rb') as f:
-                image_data = base64.b64encode(f.read())
-            
-            # 上传到Imgur
-            url = "https://api.imgur.com/3/image"
-            headers = {"Authorization": f"Client-ID {self.imgur_client_id}"}
-            payload = {"image": image_data}
-            
+        Returns:
+            Optional[str]: 图片URL，失败返回None
+        """
+        if not self.imgur_client_id:
+            self.logger.warning("未配置Imgur Client ID，跳过上传")
+            return None
+        
+        session = self._get_async_session()
+        
+        try:
             self.logger.info(f"正在上传图片到Imgur: {image_path}")
-            response = requests.post(url, headers=headers, data=payload, timeout=60)
-            response.raise_for_status()
+            with open(image_path, 'rb') as f:
+                form = aiohttp.FormData()
+                form.add_field('image', f, filename=Path(image_path).name,
+                               content_type='image/png')
+                async with session.post(self._imgur_url, headers=self._imgur_headers,
+                                        data=form) as response:
+                    if not response.ok:
+                        body = await response.text()
+                        self.logger.error(f"Imgur上传失败: HTTP {response.status} {body[:200]}")
+                        return None
+                    data = await response.json()
             
-            data = response.json()
             if data.get("success"):
                 image_url = data["data"]["link"]
                 self.logger.info(f"图片上传成功: {image_url}")
@@ -63,13 +124,41 @@ class ImageUploader:
                 self.logger.error(f"Imgur上传失败: {data}")
                 return None
                 
-        except requests.exceptions.RequestException as e:
+        except FileNotFoundError:
+            self.logger.error(f"图片文件不存在: {image_path}")
+            return None
+        except aiohttp.ClientError as e:
             self.logger.error(f"上传请求失败: {str(e)}")
             return None
         except Exception as e:
             self.logger.error(f"上传图片失败: {str(e)}")
             return None
     
+    async def upload_many(self, image_paths: List[str], concurrency: int = 4) -> List[Optional[str]]:
+        """
+        并发上传多张图片到Imgur
+        
+        Args:
+            image_paths: 本地图片路径列表
+            concurrency: 最大并发上传数
+            
+        Returns:
+            List[Optional[str]]: 与输入顺序一致的URL列表，失败项为None
+        """
+        sem = asyncio.Semaphore(concurrency)
+        
+        async def upload_one(path: str) -> Optional[str]:
+            async with sem:
+                return await self.upload_to_imgur_async(path)
+        
+        return await asyncio.gather(*(upload_one(p) for p in image_paths))
+    
+    async def aclose(self):
+        """关闭异步HTTP会话"""
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+    
     def upload_file(self, file_path: str, provider: str = "imgur") -> Optional[str]:
         """
         通用上传接口
@@ -99,8 +188,7 @@ class ImageUploader:
         
         try:
             url = "https://api.imgur.com/3/credits"
-            headers = {"Authorization": f"Client-ID {self.imgur_client_id}"}
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self._session.get(url, headers=self._imgur_headers, timeout=10)
             response.raise_for_status()
             self.logger.info("Imgur API连接测试成功")
             return True
@@ -1,11 +1,13 @@
 """多市场调度器模块 - 支持A股/美股/港股独立调度"""
 import logging
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Optional, Dict, List
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 
 import pandas as pd
+from apscheduler.executors.asyncio import AsyncIOExecutor
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
@@ -17,16 +19,36 @@ from .notion_writer import NotionWriter
 from .chart_generator import ChartGenerator
 from .config import get_settings
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
 logger = logging.getLogger(__name__)
 
 
 @dataclass
 class MarketSchedule:
-    """市场调度配置"""
+    """市场调度配置
+
+    创建时即校验 schedule_time（严格 HH:MM，小时允许一位数），无效格式直接抛出 ValueError，
+    并规范化为两位数的 HH:MM
+    """
     market: str
     enabled: bool
     schedule_time: str  # 格式: HH:MM
     days_of_week: str   # 格式: mon-fri 或 *
+    hour: int = field(init=False, repr=False)
+    minute: int = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # 秒和时区在构建cron触发器时无法使用，不接受
+        parsed = datetime.strptime(self.schedule_time.strip(), "%H:%M")
+        self.hour = parsed.hour
+        self.minute = parsed.minute
+        self.schedule_time = f"{self.hour:02d}:{self.minute:02d}"
+        self.days_of_week = self.days_of_week.strip().lower()
 
 
 class MultiMarketScheduler:
@@ -58,6 +80,9 @@ class MultiMarketScheduler:
         ),
     }
 
+    # 昨日排名缓存的最大条目数
+    YESTERDAY_CACHE_SIZE = 16
+
     def __init__(
         self,
         analyzer: SectorAnalyzer,
@@ -81,8 +106,15 @@ class MultiMarketScheduler:
         # 缓存的数据获取器
         self._fetchers: Dict[str, any] = {}
 
+        # 昨日排名缓存: (market, date, top_n) -> DataFrame，快照写入后不再变化
+        self._yesterday_top_cache: Dict[tuple, pd.DataFrame] = {}
+
+        # 数据目录只在初始化时创建一次
+        self._data_dir = Path(self.analyzer.data_path)
+        self._data_dir.mkdir(parents=True, exist_ok=True)
+
         # APScheduler
-        self.scheduler = AsyncIOScheduler()
+        self.scheduler = AsyncIOScheduler(executors={'default': AsyncIOExecutor()})
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def _get_fetcher(self, market: str):
@@ -91,16 +123,17 @@ class MultiMarketScheduler:
             self._fetchers[market] = DataFetcherFactory.create(market)
         return self._fetchers[market]
 
-    async def run_single_market(self, market: str) -> Dict:
+    async def run_single_market(self, market: str, today: Optional[str] = None) -> Dict:
         """运行单个市场的监控任务（增强版：包含完整数据用于图表生成）
 
         Args:
             market: 市场类型 ('a_share', 'us', 'hk')
+            today: 运行日期 (YYYY-MM-DD)，默认取当前日期
 
         Returns:
             Dict: 运行结果，包含完整数据
         """
-        today = datetime.now().strftime('%Y-%m-%d')
+        today = today or datetime.now().strftime('%Y-%m-%d')
         self.logger.info(f"=== 开始执行 {market.upper()} 板块监控 [{today}] ===")
 
         result = {
@@ -144,10 +177,9 @@ class MultiMarketScheduler:
             # 5. 检测轮动
             self.logger.info(f"[{market}] 步骤 4/5: 检测板块轮动...")
             last_trade_date = self._get_last_trade_date(market, today)
-            yesterday_df = self._load_market_snapshot(last_trade_date, market)
+            yesterday_top10 = self._get_yesterday_top(market, last_trade_date)
 
-            if yesterday_df is not None:
-                yesterday_top10 = self.analyzer.rank_by_inflow(yesterday_df, top_n=20)
+            if yesterday_top10 is not None:
                 rotation_signals = self.analyzer.detect_rotation(top10_df, yesterday_top10)
                 result['rotation_signals'] = rotation_signals
             else:
@@ -217,17 +249,21 @@ class MultiMarketScheduler:
 
         return chart_files
 
-    async def run_all_markets(self) -> Dict[str, Dict]:
+    async def run_all_markets(self, today: Optional[str] = None) -> Dict[str, Dict]:
         """运行所有启用的市场监控任务
 
+        Args:
+            today: 运行日期 (YYYY-MM-DD)，所有市场共用，默认取当前日期
+
         Returns:
             Dict[str, Dict]: 各市场的运行结果
         """
+        today = today or datetime.now().strftime('%Y-%m-%d')
         results = {}
 
         for market_key, schedule in self.schedules.items():
             if schedule.enabled:
-                results[market_key] = await self.run_single_market(schedule.market)
+                results[market_key] = await self.run_single_market(schedule.market, today)
             else:
                 self.logger.info(f"市场 {market_key} 已禁用，跳过")
                 results[market_key] = {'market': schedule.market, 'success': False, 'skipped': True}
@@ -243,21 +279,21 @@ class MultiMarketScheduler:
         today = datetime.now().strftime('%Y-%m-%d')
         self.logger.info(f"=== 开始执行多市场板块监控 [{today}] ===")
 
-        # 运行所有市场
-        results = await self.run_all_markets()
+        # 运行所有市场（共用同一日期，避免跨零点时各市场日期不一致）
+        results = await self.run_all_markets(today)
 
         # 检查是否有任何成功
         any_success = any(r.get('success', False) for r in results.values())
 
         if any_success:
             # 生成多市场报告
-            await self._generate_multi_market_report(results)
+            await self._generate_multi_market_report(results, today)
 
         return any_success
 
-    async def _generate_multi_market_report(self, results: Dict[str, Dict]):
+    async def _generate_multi_market_report(self, results: Dict[str, Dict], today: Optional[str] = None):
         """生成多市场综合报告（图表紧跟在每个市场分析后）"""
-        today = datetime.now().strftime('%Y-%m-%d')
+        today = today or datetime.now().strftime('%Y-%m-%d')
 
         # 生成Markdown报告
         report = self.reporter.generate_multi_markdown(results)
@@ -284,38 +320,56 @@ class MultiMarketScheduler:
                 market_names=market_names
             )
 
+    def _snapshot_path(self, date_str: str, market: str) -> Path:
+        """市场快照文件路径"""
+        return self._data_dir / f"{market}_sector_flow_{date_str.replace('-', '')}.csv"
+
     def _save_market_snapshot(self, df, date_str: str, market: str):
         """保存市场特定数据"""
-        import os
-        market_prefix = f"{market}_"
-
-        # 确保目录存在
-        data_path = self.analyzer.data_path
-        os.makedirs(data_path, exist_ok=True)
-
-        file_path = os.path.join(
-            data_path,
-            f"{market_prefix}sector_flow_{date_str.replace('-', '')}.csv"
-        )
-        df.to_csv(file_path, index=False, encoding='utf-8-sig')
+        file_path = self._snapshot_path(date_str, market)
+        if not self._write_csv_arrow(df, file_path):
+            df.to_csv(file_path, index=False, encoding='utf-8-sig')
         self.logger.info(f"[{market}] 数据已保存到: {file_path}")
 
+    def _write_csv_arrow(self, df, file_path: Path) -> bool:
+        """使用pyarrow写CSV（带BOM，兼容Excel），不可用或失败时返回False"""
+        if pa is None:
+            return False
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with open(file_path, 'wb') as f:
+                f.write(b'\xef\xbb\xbf')
+                pa_csv.write_csv(table, f)
+            return True
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            self.logger.debug(f"pyarrow写入CSV失败，回退到pandas: {e}")
+            return False
+
     def _load_market_snapshot(self, date_str: str, market: str):
         """加载市场特定数据"""
-        import os
-        market_prefix = f"{market}_"
-        file_path = os.path.join(
-            self.analyzer.data_path,
-            f"{market_prefix}sector_flow_{date_str.replace('-', '')}.csv"
-        )
-        if not os.path.exists(file_path):
+        file_path = self._snapshot_path(date_str, market)
+        if not file_path.exists():
             return None
         return pd.read_csv(file_path, encoding='utf-8-sig')
 
+    def _get_yesterday_top(self, market: str, date_str: str, top_n: int = 20) -> Optional[pd.DataFrame]:
+        """获取指定日期的排名数据（按市场和日期缓存，避免重复读CSV和排序）"""
+        key = (market, date_str, top_n)
+        if key in self._yesterday_top_cache:
+            return self._yesterday_top_cache[key]
+
+        df = self._load_market_snapshot(date_str, market)
+        if df is None:
+            return None
+
+        ranked = self.analyzer.rank_by_inflow(df, top_n=top_n)
+        if len(self._yesterday_top_cache) >= self.YESTERDAY_CACHE_SIZE:
+            self._yesterday_top_cache.pop(next(iter(self._yesterday_top_cache)))
+        self._yesterday_top_cache[key] = ranked
+        return ranked
+
     def _get_last_trade_date(self, market: str, date_str: str) -> str:
         """获取指定市场的上一个交易日"""
-        from datetime import datetime, timedelta
-
         date = datetime.strptime(date_str.replace('-', ''), '%Y%m%d')
 
         # 美股特殊处理：周一的上一个交易日是周五
@@ -342,15 +396,9 @@ class MultiMarketScheduler:
                 self.logger.info(f"市场 {market_key} 已禁用")
                 continue
 
-            try:
-                hour, minute = map(int, schedule.schedule_time.split(':'))
-            except ValueError:
-                self.logger.warning(f"[{market_key}] 无效的时间格式: {schedule.schedule_time}")
-                continue
-
             trigger = CronTrigger(
-                hour=hour,
-                minute=minute,
+                hour=schedule.hour,
+                minute=schedule.minute,
                 day_of_week=schedule.days_of_week
             )
 
@@ -360,7 +408,12 @@ class MultiMarketScheduler:
                 id=f'sector_monitor_{market_key}',
                 name=f'{market_key}板块监控',
                 args=[schedule.market],
-                replace_existing=True
+                replace_existing=True,
+                executor='default',
+                # 错过的多次触发合并为一次，同一市场不重叠运行
+                coalesce=True,
+                max_instances=1,
+                misfire_grace_time=3600
             )
 
             self.logger.info(
@@ -388,9 +441,13 @@ class MultiMarketScheduler:
         if market not in self.schedules:
             raise ValueError(f"未知市场: {market}")
 
+        changes = {}
         if schedule_time:
-            self.schedules[market].schedule_time = schedule_time
+            changes['schedule_time'] = schedule_time
         if enabled is not None:
-            self.schedules[market].enabled = enabled
+            changes['enabled'] = enabled
+
+        # 通过 replace 重新校验时间格式，同时避免修改共享的默认配置
+        self.schedules[market] = replace(self.schedules[market], **changes)
 
         self.logger.info(f"更新 {market} 调度配置: {self.schedules[market]}")
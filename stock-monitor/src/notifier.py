@@ -1,12 +1,39 @@
 """通知模块 - Telegram推送"""
 import logging
 import asyncio
+from typing import List
 from telegram import Bot
 from telegram.constants import ParseMode
 from telegram.error import TelegramError, NetworkError
 
 logger = logging.getLogger(__name__)
 
+# Telegram单条消息上限4096字符，预留余量
+MESSAGE_LIMIT = 4000
+
+
+def _split_markdown(message: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """按段落（空行）贪心切分消息，单段超长时按长度硬切"""
+    if len(message) <= limit:
+        return [message]
+
+    chunks = []
+    current = ""
+    for paragraph in message.split('\n\n'):
+        candidate = f"{current}\n\n{paragraph}" if current else paragraph
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        while len(paragraph) > limit:
+            chunks.append(paragraph[:limit])
+            paragraph = paragraph[limit:]
+        current = paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
 
 class TelegramNotifier:
     """Telegram通知器类"""
@@ -34,12 +61,14 @@ class TelegramNotifier:
         try:
             self.logger.info(f"正在发送消息到 Telegram (chat_id: {self.chat_id})...")
             
-            await self.bot.send_message(
-                chat_id=self.chat_id,
-                text=message,
-                parse_mode=ParseMode.MARKDOWN,
-                disable_web_page_preview=True
-            )
+            # 超长报告按段落分条发送，按顺序逐条发出以保证阅读顺序
+            for chunk in _split_markdown(message):
+                await self.bot.send_message(
+                    chat_id=self.chat_id,
+                    text=chunk,
+                    parse_mode=ParseMode.MARKDOWN,
+                    disable_web_page_preview=True
+                )
             
             self.logger.info("消息发送成功")
             return True
@@ -1,19 +1,154 @@
 """Notion输出模块 - 将监控数据写入Notion页面"""
 import logging
+import mimetypes
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict, Any
+from itertools import islice
+from typing import Optional, Dict, Any, Callable, List
 from pathlib import Path
+from uuid import uuid4
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+try:
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
 
 logger = logging.getLogger(__name__)
 
+# 行内粗体 **text**
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+
+# 行级Markdown语法，命中的命名分组决定block类型，未命中任何前缀时为普通段落
+# 有序列表序号限定1-2位，避免 "2026. " 或 "12.5亿" 这类内容被误判
+_LINE_RE = re.compile(
+    r"^(?:(?P<h1>#\s+)|(?P<h2>##\s+)|(?P<h3>###\s+)|(?P<hr>---$)"
+    r"|(?P<ul>[-*]\s+)|(?P<ol>\d{1,2}\.\s+))?(?P<body>.*)$"
+)
+_LINE_KINDS = ("h1", "h2", "h3", "hr", "ul", "ol")
+
+# 报告TOP3条目，如 "1. **电子** - +5.00亿 (+3.50%)"；按 " - " 分隔符截取，板块名本身可含连字符
+_SUMMARY_RE = re.compile(r"^\s*[1-3]\.\s+(.+?)\s+-\s+[^\n]*亿", re.M)
+
+
+def _rich_text_block(block_type: str, content: str) -> Dict[str, Any]:
+    return {
+        "object": "block",
+        "type": block_type,
+        block_type: {
+            "rich_text": [{"type": "text", "text": {"content": content}}]
+        }
+    }
+
+
+def _h(level: int, content: str) -> Dict[str, Any]:
+    return _rich_text_block(f"heading_{level}", content)
+
+
+def _bullet(content: str) -> Dict[str, Any]:
+    return _rich_text_block("bulleted_list_item", content)
+
+
+def _numbered(content: str) -> Dict[str, Any]:
+    return _rich_text_block("numbered_list_item", content)
+
+
+def _para(rich_text: list) -> Dict[str, Any]:
+    return {"object": "block", "type": "paragraph", "paragraph": {"rich_text": rich_text}}
+
+
+# 分隔线没有内容，所有位置共用同一个只读实例
+_DIVIDER = {"object": "block", "type": "divider", "divider": {}}
+
+_BLOCK_FACTORIES = {
+    "h1": lambda body: _h(1, body),
+    "h2": lambda body: _h(2, body),
+    "h3": lambda body: _h(3, body),
+    "hr": lambda body: _DIVIDER,
+    "ul": _bullet,
+    "ol": _numbered,
+}
+
+
+class _RateLimiter:
+    """令牌桶限流器，线程安全"""
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 令牌桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """获取一个令牌，不足时阻塞等待"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            wait = 0.0
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+                self._last += wait
+                self._tokens = 0.0
+            else:
+                self._tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+
+
+# 所有NotionWriter实例和线程共用同一限流器，整体不超过Notion约3次/秒的限制
+_rate_limiter = _RateLimiter(rate=2.5, capacity=3)
+
 
 class NotionWriter:
     """Notion写入器类 - 将监控报告写入Notion页面"""
 
     API_BASE = "https://api.notion.com/v1"
     API_VERSION = "2022-06-28"
+    # Notion限流约3次/秒，并发数保持在此之下
+    MAX_WORKERS = 3
+    # 429时的最大重试次数
+    MAX_RATE_LIMIT_RETRIES = 5
+    # 创建页面时children最多100个
+    PAGE_CREATE_CHILDREN_LIMIT = 100
+
+    # 鉴权头由session携带；Content-Type置为None以移除会话默认的JSON类型，由requests生成multipart边界
+    _UPLOAD_HEADERS = {"Content-Type": None}
+
+    _MIME = {
+        ".png": "image/png",
+        ".jpg": "image/jpeg",
+        ".jpeg": "image/jpeg",
+        ".gif": "image/gif",
+        ".webp": "image/webp",
+    }
+    # 按顺序匹配文件名中的关键字
+    _CHART_TITLES = (
+        ("top_sectors_trend", "TOP板块资金流向趋势"),
+        ("sector_comparison", "板块对比分析"),
+        ("market_heatmap", "板块资金流向热力图"),
+    )
 
     def __init__(self, api_key: str, parent_page_id: str):
         """
@@ -32,6 +167,66 @@ class NotionWriter:
         }
         self.logger = logging.getLogger(self.__class__.__name__)
 
+        # 复用连接池，整个报告写入过程中保持keep-alive，避免每次请求重新握手
+        # 429由_request按Retry-After重试，这里只处理网关类错误（唯一的5xx重试层）
+        # POST（创建页面/数据库记录）不是幂等的，超时后重试可能产生重复页面，因此不自动重试
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=["GET", "PATCH"]
+            )
+        )
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=self.MAX_WORKERS)
+
+    def close(self):
+        """关闭HTTP会话和线程池，释放连接"""
+        self._pool.shutdown(wait=True)
+        self.session.close()
+
+    def _request(self, method: str, url: str,
+                 body_factory: Optional[Callable[[], Any]] = None, **kwargs) -> requests.Response:
+        """
+        经限流器发送请求，遇到429时按Retry-After指数退避重试
+
+        Args:
+            method: HTTP方法，如 'post'
+            url: 请求地址
+            body_factory: 可选，每次发送前调用以生成data（流式请求体无法重复发送）
+            **kwargs: 透传给session的参数
+
+        Returns:
+            requests.Response: 最后一次请求的响应
+        """
+        send = getattr(self.session, method)
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            _rate_limiter.acquire()
+            if body_factory is not None:
+                kwargs["data"] = body_factory()
+            response = send(url, **kwargs)
+            if response.status_code != 429 or attempt == self.MAX_RATE_LIMIT_RETRIES:
+                return response
+
+            try:
+                retry_after = float(response.headers.get("Retry-After", "1"))
+            except (TypeError, ValueError):
+                retry_after = 1.0
+            delay = max(retry_after, 0.5 * 2 ** attempt)
+            self.logger.warning(f"Notion限流(429)，{delay:.1f}秒后第{attempt + 1}次重试")
+            time.sleep(delay)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def write_report(self, title: str, content: str, database_id: Optional[str] = None,
                      chart_files: Optional[list] = None, chart_urls: Optional[list] = None,
                      auto_upload_charts: bool = True) -> Optional[str]:
@@ -58,12 +253,19 @@ class NotionWriter:
                 chart_blocks = self._create_chart_blocks(chart_files, chart_urls, auto_upload_charts)
                 blocks.extend(chart_blocks)
 
-            # 创建页面
-            page_id = self._create_page(title, blocks)
+            # 创建页面时带上前100个blocks；数据库记录与剩余blocks写入互不依赖，可并行
+            limit = self.PAGE_CREATE_CHILDREN_LIMIT
+            page_id = self._create_page(title, blocks[:limit])
 
+            db_future = None
             if page_id and database_id:
-                # 同时添加到数据库
-                self._add_to_database(database_id, title, content)
+                db_future = self._pool.submit(self._add_to_database, database_id, title, content)
+
+            if page_id and len(blocks) > limit:
+                self._add_blocks_to_page(page_id, blocks[limit:])
+
+            if db_future is not None:
+                db_future.result()
 
             return page_id
 
@@ -195,14 +397,14 @@ class NotionWriter:
 
         Args:
             title: 页面标题
-            blocks: Notion block列表
+            blocks: 随创建请求一起发送的blocks，最多 PAGE_CREATE_CHILDREN_LIMIT 个，
+                超出部分由调用方通过 _add_blocks_to_page 追加
 
         Returns:
             Optional[str]: 页面ID
         """
         url = f"{self.API_BASE}/pages"
 
-        # 先创建空页面
         payload = {
             "parent": {"page_id": self.parent_page_id},
             "icon": {"type": "emoji", "emoji": "📊"},
@@ -212,57 +414,79 @@ class NotionWriter:
                 }
             }
         }
+        if blocks:
+            payload["children"] = blocks
 
         try:
-            response = requests.post(url, headers=self.headers, json=payload, timeout=30)
+            response = self._request("post", url, data=_dumps(payload), timeout=30)
             response.raise_for_status()
             data = response.json()
             page_id = data.get("id")
             self.logger.info(f"成功创建Notion页面: {page_id}")
-
-            # 然后分批添加blocks
-            if blocks and page_id:
-                self._add_blocks_to_page(page_id, blocks)
-
             return page_id
 
         except requests.exceptions.RequestException as e:
             self.logger.error(f"创建Notion页面请求失败: {str(e)}")
             raise
 
-    def _add_blocks_to_page(self, page_id: str, blocks: list):
+    def _add_blocks_to_page(self, page_id: str, blocks: list) -> list:
         """
         分批添加blocks到页面
 
         Args:
             page_id: 页面ID
             blocks: block列表
+
+        Returns:
+            list: 添加失败的批次（每项为block列表），全部成功时为空
         """
         url = f"{self.API_BASE}/blocks/{page_id}/children"
 
         # Notion限制每次最多100个blocks
         batch_size = 90
+        failed = []
         for i in range(0, len(blocks), batch_size):
             batch = blocks[i:i+batch_size]
-            payload = {"children": batch}
-
-            try:
-                response = requests.patch(url, headers=self.headers, json=payload, timeout=30)
-                response.raise_for_status()
+            if self._patch_blocks(url, batch):
                 self.logger.debug(f"已添加 {len(batch)} 个blocks")
-            except requests.exceptions.HTTPError as e:
-                self.logger.error(f"添加blocks失败: {str(e)}")
-                # 打印详细的错误信息
+            else:
+                # 继续添加剩余的blocks
+                failed.append(batch)
+
+        if failed:
+            lost = sum(len(batch) for batch in failed)
+            self.logger.error(f"共 {len(failed)} 批 {lost} 个blocks添加失败")
+        return failed
+
+    def _patch_blocks(self, url: str, batch: list) -> bool:
+        """
+        追加一批blocks，失败时记录错误并返回False
+
+        429由_request按Retry-After重试，502/503/504由会话的HTTPAdapter重试，这里不再叠加重试
+
+        Args:
+            url: children接口地址
+            batch: block列表
+
+        Returns:
+            bool: 是否成功
+        """
+        response = None
+        try:
+            response = self._request("patch", url, data=_dumps({"children": batch}), timeout=30)
+            response.raise_for_status()
+            return True
+        except requests.exceptions.HTTPError as e:
+            self.logger.error(f"添加blocks失败: {str(e)}")
+            if response.status_code < 500:
+                # 请求本身有误，打印详细错误信息
                 try:
-                    error_detail = response.json()
-                    self.logger.error(f"错误详情: {error_detail}")
-                except:
+                    self.logger.error(f"错误详情: {response.json()}")
+                except ValueError:
                     self.logger.error(f"响应内容: {response.text}")
-                # 继续添加剩余的blocks
-                continue
-            except requests.exceptions.RequestException as e:
-                self.logger.error(f"添加blocks失败: {str(e)}")
-                continue
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"添加blocks失败: {str(e)}")
+        return False
 
     def _add_to_database(self, database_id: str, title: str, content: str) -> bool:
         """
@@ -293,7 +517,7 @@ class NotionWriter:
         }
 
         try:
-            response = requests.post(url, headers=self.headers, json=payload, timeout=30)
+            response = self._request("post", url, data=_dumps(payload), timeout=30)
             response.raise_for_status()
             self.logger.info("成功添加数据库记录")
             return True
@@ -313,71 +537,23 @@ class NotionWriter:
             list: Notion block列表
         """
         blocks = []
-        lines = markdown.split('\n')
+        if not markdown:
+            return blocks
 
-        for line in lines:
-            line = line.strip()
+        blocks_append = blocks.append
+        for raw in markdown.splitlines():
+            line = raw.strip()
             if not line:
                 continue
 
-            # 处理标题
-            if line.startswith('# '):
-                blocks.append({
-                    "object": "block",
-                    "type": "heading_1",
-                    "heading_1": {
-                        "rich_text": [{"type": "text", "text": {"content": line[2:]}}]
-                    }
-                })
-            elif line.startswith('## '):
-                blocks.append({
-                    "object": "block",
-                    "type": "heading_2",
-                    "heading_2": {
-                        "rich_text": [{"type": "text", "text": {"content": line[3:]}}]
-                    }
-                })
-            elif line.startswith('### '):
-                blocks.append({
-                    "object": "block",
-                    "type": "heading_3",
-                    "heading_3": {
-                        "rich_text": [{"type": "text", "text": {"content": line[4:]}}]
-                    }
-                })
-            # 处理分隔线
-            elif line == '---':
-                blocks.append({
-                    "object": "block",
-                    "type": "divider",
-                    "divider": {}
-                })
-            # 处理列表项
-            elif line.startswith('- ') or line.startswith('* '):
-                blocks.append({
-                    "object": "block",
-                    "type": "bulleted_list_item",
-                    "bulleted_list_item": {
-                        "rich_text": [{"type": "text", "text": {"content": line[2:]}}]
-                    }
-                })
-            elif line.startswith('1. ') or (len(line) > 2 and line[0].isdigit() and '. ' in line[:5]):
-                blocks.append({
-                    "object": "block",
-                    "type": "numbered_list_item",
-                    "numbered_list_item": {
-                        "rich_text": [{"type": "text", "text": {"content": line[line.find('. ')+2:]}}]
-                    }
-                })
-            # 普通段落
+            match = _LINE_RE.match(line)
+            kind = next((k for k in _LINE_KINDS if match.group(k)), None)
+
+            if kind is not None:
+                blocks_append(_BLOCK_FACTORIES[kind](match.group('body')))
             else:
-                # 处理粗体 **text**
-                rich_text = self._parse_inline_formatting(line)
-                blocks.append({
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {"rich_text": rich_text}
-                })
+                # 普通段落，处理粗体 **text**
+                blocks_append(_para(self._parse_inline_formatting(line)))
 
         return blocks
 
@@ -392,32 +568,20 @@ class NotionWriter:
             list: rich_text列表
         """
         parts = []
-        current = ""
-        i = 0
-
-        while i < len(text):
-            if i < len(text) - 1 and text[i:i+2] == "**":
-                if current:
-                    parts.append({"type": "text", "text": {"content": current}})
-                    current = ""
-                # 找到结束**
-                end = text.find("**", i+2)
-                if end != -1:
-                    parts.append({
-                        "type": "text",
-                        "text": {"content": text[i+2:end]},
-                        "annotations": {"bold": True}
-                    })
-                    i = end + 2
-                else:
-                    current += text[i]
-                    i += 1
-            else:
-                current += text[i]
-                i += 1
+        pos = 0
+
+        for m in _BOLD_RE.finditer(text):
+            if m.start() > pos:
+                parts.append({"type": "text", "text": {"content": text[pos:m.start()]}})
+            parts.append({
+                "type": "text",
+                "text": {"content": m.group(1)},
+                "annotations": {"bold": True}
+            })
+            pos = m.end()
 
-        if current:
-            parts.append({"type": "text", "text": {"content": current}})
+        if pos < len(text):
+            parts.append({"type": "text", "text": {"content": text[pos:]}})
 
         return parts if parts else [{"type": "text", "text": {"content": text}}]
 
@@ -432,13 +596,12 @@ class NotionWriter:
             list: Notion block列表
         """
         blocks = []
+        valid = self._valid_charts(chart_files)
+        upload_ids = self._upload_images(valid)
 
-        for chart_file in chart_files:
-            if not chart_file or not Path(chart_file).exists():
-                continue
-
+        for chart_file in valid:
             # 上传图片到Notion
-            file_upload_id = self.upload_image_to_notion(chart_file)
+            file_upload_id = upload_ids.get(chart_file)
             if file_upload_id:
                 blocks.append(self._create_image_block_with_file_upload(file_upload_id))
             else:
@@ -482,12 +645,22 @@ class NotionWriter:
         ]
 
         chart_urls = chart_urls or []
+        valid = self._valid_charts(chart_files)
+
+        # 没有外部URL的图表先并行上传，再按顺序生成blocks
+        upload_ids = {}
+        if auto_upload:
+            pending = {
+                f: valid[f] for i, f in enumerate(chart_files)
+                if f in valid and not (i < len(chart_urls) and chart_urls[i])
+            }
+            upload_ids = self._upload_images(pending)
 
         for i, chart_file in enumerate(chart_files):
-            if not chart_file or not Path(chart_file).exists():
+            if chart_file not in valid:
                 continue
 
-            chart_name = Path(chart_file).stem
+            chart_name = valid[chart_file][0].stem
 
             # 添加图表标题
             blocks.append({
@@ -512,7 +685,7 @@ class NotionWriter:
                 })
             # 优先级2: 自动上传到Notion
             elif auto_upload:
-                file_upload_id = self.upload_image_to_notion(chart_file)
+                file_upload_id = upload_ids.get(chart_file)
                 if file_upload_id:
                     # 使用file_upload创建image block
                     blocks.append(self._create_image_block_with_file_upload(file_upload_id))
@@ -525,6 +698,59 @@ class NotionWriter:
 
         return blocks
 
+    def upload_all(self, image_paths: list,
+                   file_sizes: Optional[list] = None) -> List[Optional[str]]:
+        """
+        并行上传多张图片到Notion，多个3步上传流程相互重叠
+
+        Args:
+            image_paths: 图片文件路径列表
+            file_sizes: 可选，与image_paths对应的文件大小（已知时跳过stat）
+
+        Returns:
+            List[Optional[str]]: 与输入顺序一致的file_upload ID列表，失败为None
+        """
+        if not image_paths:
+            return []
+        file_sizes = file_sizes or [None] * len(image_paths)
+        # 线程池并发受限流器约束，总请求速率不超过Notion限制
+        return list(self._pool.map(self.upload_image_to_notion, image_paths, file_sizes))
+
+    def _valid_charts(self, chart_files: list) -> Dict[str, tuple]:
+        """
+        一次性检查图表文件，过滤掉不存在的文件
+
+        Args:
+            chart_files: 图表文件路径列表
+
+        Returns:
+            Dict: 文件路径到 (Path, 文件大小) 的映射，保持原顺序且去重
+        """
+        valid = {}
+        for chart_file in chart_files:
+            if not chart_file or chart_file in valid:
+                continue
+            path = Path(chart_file)
+            try:
+                valid[chart_file] = (path, path.stat().st_size)
+            except OSError:
+                continue
+        return valid
+
+    def _upload_images(self, valid: Dict[str, tuple]) -> Dict[str, Optional[str]]:
+        """
+        上传已校验的图表并按文件路径索引结果
+
+        Args:
+            valid: _valid_charts返回的映射
+
+        Returns:
+            Dict: 文件路径到file_upload ID的映射，上传失败为None
+        """
+        files = list(valid)
+        sizes = [size for _, size in valid.values()]
+        return dict(zip(files, self.upload_all(files, sizes)))
+
     def _add_file_fallback_block(self, blocks: list, chart_file: str):
         """
         添加文件路径后备block（当上传失败时使用）
@@ -556,14 +782,10 @@ class NotionWriter:
 
     def _get_chart_title(self, chart_name: str) -> str:
         """根据文件名获取图表标题"""
-        if "top_sectors_trend" in chart_name:
-            return "TOP板块资金流向趋势"
-        elif "sector_comparison" in chart_name:
-            return "板块对比分析"
-        elif "market_heatmap" in chart_name:
-            return "板块资金流向热力图"
-        else:
-            return "图表分析"
+        for key, title in self._CHART_TITLES:
+            if key in chart_name:
+                return title
+        return "图表分析"
 
     def _extract_summary(self, content: str) -> str:
         """
@@ -575,19 +797,7 @@ class NotionWriter:
         Returns:
             str: 摘要
         """
-        lines = content.split('\n')
-        top3 = []
-
-        for line in lines:
-            if line.strip().startswith(('1.', '2.', '3.')) and '亿' in line:
-                # 提取板块名称
-                parts = line.split(' - ')
-                if len(parts) > 0:
-                    name = parts[0].split('. ')[-1] if '. ' in parts[0] else parts[0]
-                    top3.append(name)
-                    if len(top3) >= 3:
-                        break
-
+        top3 = [m.group(1).strip() for m in islice(_SUMMARY_RE.finditer(content), 3)]
         return ' > '.join(top3) if top3 else '无数据'
 
     def create_monitoring_database(self, title: str = "板块监控记录") -> Optional[str]:
@@ -623,7 +833,7 @@ class NotionWriter:
         }
 
         try:
-            response = requests.post(url, headers=self.headers, json=payload, timeout=30)
+            response = self._request("post", url, data=_dumps(payload), timeout=30)
             response.raise_for_status()
             data = response.json()
             database_id = data.get("id")
@@ -643,7 +853,7 @@ class NotionWriter:
         """
         try:
             url = f"{self.API_BASE}/users/me"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._request("get", url, timeout=10)
             response.raise_for_status()
             self.logger.info("Notion API连接测试成功")
             return True
@@ -652,7 +862,8 @@ class NotionWriter:
             self.logger.error(f"Notion API连接测试失败: {str(e)}")
             return False
 
-    def upload_image_to_notion(self, image_path: str) -> Optional[str]:
+    def upload_image_to_notion(self, image_path: str,
+                               file_size: Optional[int] = None) -> Optional[str]:
         """
         上传图片到Notion（3步上传流程）
 
@@ -660,28 +871,24 @@ class NotionWriter:
 
         Args:
             image_path: 图片文件路径
+            file_size: 可选，已知的文件大小（调用方已stat过时传入）
 
         Returns:
             Optional[str]: file_upload ID，失败返回None
         """
         try:
             file_path = Path(image_path)
-            if not file_path.exists():
-                self.logger.error(f"图片文件不存在: {image_path}")
-                return None
+            if file_size is None:
+                if not file_path.exists():
+                    self.logger.error(f"图片文件不存在: {image_path}")
+                    return None
+                file_size = file_path.stat().st_size
 
-            file_size = file_path.stat().st_size
             file_name = file_path.name
             file_ext = file_path.suffix.lower()
 
-            # 确定MIME类型
-            mime_type = "image/png"  # 默认
-            if file_ext == ".jpg" or file_ext == ".jpeg":
-                mime_type = "image/jpeg"
-            elif file_ext == ".gif":
-                mime_type = "image/gif"
-            elif file_ext == ".webp":
-                mime_type = "image/webp"
+            # 确定MIME类型，未知类型默认PNG
+            mime_type = self._MIME.get(file_ext) or mimetypes.guess_type(file_name)[0] or "image/png"
 
             self.logger.info(f"开始上传图片: {file_name} ({file_size} bytes)")
 
@@ -693,13 +900,10 @@ class NotionWriter:
                 "content_length": file_size
             }
 
-            step1_headers = self.headers.copy()
-            step1_headers["Content-Type"] = "application/json"
-
-            response = requests.post(
+            response = self._request(
+                "post",
                 step1_url,
-                headers=step1_headers,
-                json=step1_payload,
+                data=_dumps(step1_payload),
                 timeout=30
             )
             response.raise_for_status()
@@ -716,18 +920,34 @@ class NotionWriter:
 
             # Step 2: 上传文件内容 (multipart/form-data)
             with open(file_path, "rb") as f:
-                files = {"file": (file_name, f, mime_type)}
-                upload_headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Notion-Version": self.API_VERSION
-                }
-                upload_response = requests.post(
-                    upload_url,
-                    headers=upload_headers,
-                    files=files,
-                    timeout=60
-                )
-                upload_response.raise_for_status()
+                if MultipartEncoder is not None:
+                    # 从磁盘流式发送，每次重试回到文件开头重建请求体
+                    boundary = uuid4().hex
+
+                    def build_body():
+                        f.seek(0)
+                        return MultipartEncoder(
+                            fields={"file": (file_name, f, mime_type)},
+                            boundary=boundary
+                        )
+
+                    upload_response = self._request(
+                        "post",
+                        upload_url,
+                        body_factory=build_body,
+                        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                        timeout=60
+                    )
+                else:
+                    # 未安装requests-toolbelt时读入内存，429重试时可以重新发送
+                    upload_response = self._request(
+                        "post",
+                        upload_url,
+                        headers=self._UPLOAD_HEADERS,
+                        files={"file": (file_name, f.read(), mime_type)},
+                        timeout=60
+                    )
+            upload_response.raise_for_status()
 
             self.logger.debug(f"文件内容上传成功")
 
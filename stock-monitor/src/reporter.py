@@ -1,11 +1,135 @@
 """报告生成模块 - 生成Markdown格式报告"""
 import logging
+import numpy as np
 import pandas as pd
 from typing import List, Dict, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+__all__ = ['ReportGenerator']
+
+# 报告用到的列 -> 逐行遍历时的字段名（中文列名无法作为namedtuple属性）
+_ROW_COLUMNS = {
+    'sector_name': 'sector_name',
+    'name': 'name',
+    'change_pct': 'change_pct',
+    '今日涨跌幅': 'change_pct_cn',
+    'symbol': 'symbol',
+    'main_inflow': 'main_inflow',
+    'super_large_inflow': 'super_large_inflow',
+    '今日主力净流入-净额': 'main_inflow_cn',
+    '今日超大单净流入-净额': 'super_large_inflow_cn',
+    'inflow_yi': 'inflow_yi',
+}
+_MARKET_NAMES = {'a_share': 'A股', 'us': '美股', 'hk': '港股'}
+_MARKET_EMOJIS = {'a_share': '🇨🇳', 'us': '🇺🇸', 'hk': '🇭🇰'}
+
+# 多市场报告的章节顺序: (市场键, 章节标题, 市场名称)
+_MARKETS = (
+    ('a_share', '🇨🇳 A股板块资金流向', 'A股'),
+    ('us', '🇺🇸 美股板块表现 (Sector ETFs)', '美股'),
+    ('hk', '🇭🇰 港股行业指数', '港股'),
+)
+
+# 资金流向分析表格
+_FLOW_TEMPLATE = (
+    "{trend_emoji} **整体流向**: {trend}\n"
+    "\n"
+    "| 指标 | 数值 |\n"
+    "|------|------|\n"
+    "| 资金净流入总额 | +{total_inflow:.2f} 亿 |\n"
+    "| 资金净流出总额 | {total_outflow:.2f} 亿 |\n"
+    "| 净流入板块数 | {inflow_sectors} 个 |\n"
+    "| 净流出板块数 | {outflow_sectors} 个 |\n"
+    "| 净流入集中度 | {concentration} |\n"
+    "\n"
+    "**净流向**: {net_flow:+.2f} 亿"
+)
+
+# 净流向符号 -> (趋势emoji, 趋势描述)
+_FLOW_TRENDS = {
+    1: ("🟢", "📈 **资金净流入**，市场呈现流入态势"),
+    0: ("⚪", "➡️ **资金平衡**，市场整体持平"),
+    -1: ("🔴", "📉 **资金净流出**，市场呈现流出态势"),
+}
+
+# 净流入候选列，按优先级排列
+_INFLOW_COLUMNS = ('main_inflow', 'super_large_inflow', '今日主力净流入-净额', '今日超大单净流入-净额')
+
+# 列名组合 -> 解析出的净流入列
+_inflow_col_cache: Dict[tuple, Optional[str]] = {}
+
+
+def _iter_rows(df: pd.DataFrame):
+    """按报告所需列逐行遍历，缺失的列填充为NaN
+
+    Returns:
+        Iterator: itertuples生成的Row，Index为原索引
+    """
+    view = df.reindex(columns=list(_ROW_COLUMNS)).rename(columns=_ROW_COLUMNS)
+    return view.itertuples(index=True, name='Row')
+
+
+def _resolve_inflow_col(df: pd.DataFrame) -> Optional[str]:
+    """按优先级查找净流入列，结果按列名组合缓存
+
+    Returns:
+        Optional[str]: 列名，不存在时返回None
+    """
+    key = tuple(df.columns)
+    try:
+        return _inflow_col_cache[key]
+    except KeyError:
+        col = next((c for c in _INFLOW_COLUMNS if c in df.columns), None)
+        _inflow_col_cache[key] = col
+        return col
+
+
+def _coalesce(df: pd.DataFrame, columns: tuple) -> pd.Series:
+    """按顺序合并多个候选列，取第一个非空值；均不存在时为全NaN"""
+    result = None
+    for col in columns:
+        if col in df.columns:
+            result = df[col] if result is None else result.fillna(df[col])
+    if result is None:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    return result
+
+
+def _render_top_rows(df: pd.DataFrame) -> List[str]:
+    """整表生成TOP排名行，df需已包含 inflow_yi 列"""
+    ranks = df.index + 1
+    names = _coalesce(df, ('sector_name', 'name')).fillna(
+        pd.Series([f'板块{rank}' for rank in ranks], index=df.index)
+    )
+    changes = _coalesce(df, ('change_pct', '今日涨跌幅')).fillna(0)
+    # 添加ETF代码（美股/港股）
+    symbols = _coalesce(df, ('symbol',)).fillna('')
+    symbols = np.where(symbols.astype(bool), ' (' + symbols.astype(str) + ')', '')
+
+    return [
+        f"{rank}. **{name}**{symbol} - {inflow:+.2f}亿 ({change:+.2f}%)"
+        for rank, name, symbol, inflow, change
+        in zip(ranks, names, symbols, df['inflow_yi'], changes)
+    ]
+
+
+def _format_rank(rank) -> str:
+    """格式化昨日排名：数字加#前缀（含numpy整数），其他如 ">10" 原样输出"""
+    if isinstance(rank, (int, np.integer)) and not isinstance(rank, bool):
+        return f"#{rank}"
+    return str(rank)
+
+
+def _first_valid(row, fields, default):
+    """返回第一个非空字段值"""
+    for field in fields:
+        value = getattr(row, field, None)
+        if value is not None and pd.notna(value):
+            return value
+    return default
+
 
 class ReportGenerator:
     """报告生成器类
@@ -14,7 +138,7 @@ class ReportGenerator:
     """
 
     def __init__(self):
-        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger = logger
 
     def generate_markdown(self, ranking_df: pd.DataFrame, rotation_list: List[Dict]) -> str:
         """生成单市场Markdown格式报告（兼容旧版本）
@@ -26,7 +150,8 @@ class ReportGenerator:
         Returns:
             str: Markdown格式报告
         """
-        today = datetime.now().strftime('%Y-%m-%d')
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
 
         lines = [
             f"📊 **板块资金流向监控 - {today}**",
@@ -37,17 +162,17 @@ class ReportGenerator:
 
         # 添加TOP10列表
         if ranking_df is not None and not ranking_df.empty:
-            for idx, row in ranking_df.iterrows():
-                rank = idx + 1
+            for row in _iter_rows(self._attach_inflow_column(ranking_df)):
+                rank = row.Index + 1
 
                 # 获取板块名
-                sector_name = row.get('sector_name', row.get('name', f'板块{rank}'))
+                sector_name = _first_valid(row, ('sector_name', 'name'), f'板块{rank}')
 
                 # 获取净流入（转换为亿元）
-                inflow = self._get_inflow_value(row)
+                inflow = row.inflow_yi
 
                 # 获取涨跌幅
-                change_pct = row.get('change_pct', row.get('今日涨跌幅', 0))
+                change_pct = _first_valid(row, ('change_pct', 'change_pct_cn'), 0)
 
                 lines.append(f"{rank}. {sector_name} - {inflow:+.2f}亿 ({change_pct:+.2f}%)")
         else:
@@ -60,19 +185,16 @@ class ReportGenerator:
         lines.append("")
 
         if rotation_list:
-            for signal in rotation_list:
-                sector = signal['sector_name']
-                prev_rank = signal['yesterday_rank']
-                if isinstance(prev_rank, int):
-                    lines.append(f"- {sector}（昨日排名：#{prev_rank}）")
-                else:
-                    lines.append(f"- {sector}（昨日排名：{prev_rank}）")
+            lines.extend([
+                f"- {s['sector_name']}（昨日排名：{_format_rank(s['yesterday_rank'])}）"
+                for s in rotation_list
+            ])
         else:
             lines.append("_今日无新进入TOP10的板块_")
 
         lines.append("")
         lines.append("---")
-        lines.append(f"_数据更新时间：{datetime.now().strftime('%H:%M:%S')}_")
+        lines.append(f"_数据更新时间：{now.strftime('%H:%M:%S')}_")
 
         return '\n'.join(lines)
 
@@ -90,59 +212,41 @@ class ReportGenerator:
         Returns:
             str: Markdown格式综合报告
         """
-        today = datetime.now().strftime('%Y-%m-%d')
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
 
         lines = [
             f"# 📊 多市场板块监控 - {today}",
             ""
         ]
 
-        # A股部分
-        if 'a_share' in market_results:
-            lines.extend(self._generate_market_section(
-                market_results['a_share'],
-                "🇨🇳 A股板块资金流向",
-                "A股"
-            ))
-
-        # 美股部分
-        if 'us' in market_results:
-            lines.extend(self._generate_market_section(
-                market_results['us'],
-                "🇺🇸 美股板块表现 (Sector ETFs)",
-                "美股"
-            ))
-
-        # 港股部分
-        if 'hk' in market_results:
-            lines.extend(self._generate_market_section(
-                market_results['hk'],
-                "🇭🇰 港股行业指数",
-                "港股"
-            ))
+        for key, title, name in _MARKETS:
+            if key in market_results:
+                self._generate_market_section(market_results[key], title, name, lines)
 
         # 总结
         lines.append("---")
         lines.append("")
-        lines.append(f"_报告生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}_")
+        lines.append(f"_报告生成时间：{now.strftime('%Y-%m-%d %H:%M:%S')}_")
 
         return '\n'.join(lines)
 
-    def _generate_market_section(self, result: Dict, title: str, market_name: str) -> List[str]:
+    def _generate_market_section(self, result: Dict, title: str, market_name: str,
+                                 out: Optional[List[str]] = None) -> List[str]:
         """生成单个市场的报告部分（新版本：包含资金流向分析）
 
         Args:
             result: 市场运行结果
             title: 章节标题
             market_name: 市场名称（用于日志）
+            out: 可选，直接追加到该行列表，避免生成中间列表
 
         Returns:
-            List[str]: Markdown行列表
+            List[str]: Markdown行列表（传入out时即为out）
         """
-        lines = [
-            f"## {title}",
-            ""
-        ]
+        lines = out if out is not None else []
+        lines.append(f"## {title}")
+        lines.append("")
 
         if not result.get('success', False):
             error_msg = result.get('error', '未知错误')
@@ -154,31 +258,17 @@ class ReportGenerator:
         rotation_list = result.get('rotation_signals', [])
         full_df = result.get('full_data')  # 完整数据用于资金流向分析
 
-        # ===== 1. 资金流向整体分析 =====
-        if full_df is not None and not full_df.empty:
-            flow_analysis = self._analyze_market_flow(full_df, market_name)
-            lines.append("### 💰 资金流向分析")
-            lines.append("")
-            lines.append(flow_analysis)
-            lines.append("")
+        # ===== 1. 资金流向整体分析（无可用数据时整节省略）=====
+        flow_text = self._analyze_market_flow(full_df, market_name)
+        if flow_text is not None:
+            lines.extend(("### 💰 资金流向分析", "", flow_text, ""))
 
         # ===== 2. TOP10排名 =====
         lines.append("### 🔥 TOP10 板块排名")
         lines.append("")
 
         if top10_df is not None and not top10_df.empty:
-            for idx, row in top10_df.head(10).iterrows():
-                rank = idx + 1
-                sector_name = row.get('sector_name', row.get('name', f'板块{rank}'))
-                inflow = self._get_inflow_value(row)
-                change_pct = row.get('change_pct', row.get('今日涨跌幅', 0))
-
-                # 添加ETF代码（美股/港股）
-                symbol = row.get('symbol', '')
-                if symbol:
-                    lines.append(f"{rank}. **{sector_name}** ({symbol}) - {inflow:+.2f}亿 ({change_pct:+.2f}%)")
-                else:
-                    lines.append(f"{rank}. **{sector_name}** - {inflow:+.2f}亿 ({change_pct:+.2f}%)")
+            lines.extend(_render_top_rows(self._attach_inflow_column(top10_df.head(10))))
         else:
             lines.append("_暂无数据_")
 
@@ -189,13 +279,10 @@ class ReportGenerator:
         lines.append("")
 
         if rotation_list:
-            for signal in rotation_list:
-                sector = signal['sector_name']
-                prev_rank = signal['yesterday_rank']
-                if isinstance(prev_rank, int):
-                    lines.append(f"- 📈 **{sector}**（昨日排名：#{prev_rank}）")
-                else:
-                    lines.append(f"- 📈 **{sector}**（昨日排名：{prev_rank}）")
+            lines.extend([
+                f"- 📈 **{s['sector_name']}**（昨日排名：{_format_rank(s['yesterday_rank'])}）"
+                for s in rotation_list
+            ])
         else:
             lines.append("_今日无新进入TOP10的板块_")
 
@@ -209,40 +296,36 @@ class ReportGenerator:
 
         return lines
 
-    def _analyze_market_flow(self, df, market_name: str) -> str:
+    def _analyze_market_flow(self, df, market_name: str,
+                             inflow_col: Optional[str] = None) -> Optional[str]:
         """分析市场整体资金流向
 
         Args:
             df: 完整板块数据
             market_name: 市场名称
+            inflow_col: 可选，已解析的净流入列名
 
         Returns:
-            str: 资金流向分析文本
+            Optional[str]: 资金流向分析文本；数据为空、缺少净流入列或计算失败时返回None
         """
         if df is None or df.empty:
-            return "_暂无资金流向数据_"
+            return None
 
-        inflow = self._calculate_total_inflow(df, market_name)
+        # 没有净流入列（如部分美股/港股ETF数据）时直接返回，不做任何计算
+        if inflow_col is None:
+            inflow_col = _resolve_inflow_col(df)
+        if inflow_col is None:
+            return None
 
+        inflow = self._calculate_total_inflow(df, market_name, inflow_col)
         if inflow is None:
-            return "_资金流向数据计算失败_"
+            return None
 
         total_inflow = inflow['total_inflow']
-        total_outflow = inflow['total_outflow']
         net_flow = inflow['net_flow']
-        inflow_sectors = inflow['inflow_sectors']
-        outflow_sectors = inflow['outflow_sectors']
 
         # 判断资金流向趋势
-        if net_flow > 0:
-            trend = "📈 **资金净流入**，市场呈现流入态势"
-            trend_emoji = "🟢"
-        elif net_flow < 0:
-            trend = "📉 **资金净流出**，市场呈现流出态势"
-            trend_emoji = "🔴"
-        else:
-            trend = "➡️ **资金平衡**，市场整体持平"
-            trend_emoji = "⚪"
+        trend_emoji, trend = _FLOW_TRENDS[int(np.sign(net_flow))]
 
         # 计算集中度
         if inflow['top5_inflow'] and total_inflow > 0:
@@ -251,44 +334,40 @@ class ReportGenerator:
         else:
             concentration_text = "数据不足"
 
-        analysis = f"""
-{trend_emoji} **整体流向**: {trend}
-
-| 指标 | 数值 |
-|------|------|
-| 资金净流入总额 | +{total_inflow:.2f} 亿 |
-| 资金净流出总额 | {total_outflow:.2f} 亿 |
-| 净流入板块数 | {inflow_sectors} 个 |
-| 净流出板块数 | {outflow_sectors} 个 |
-| 净流入集中度 | {concentration_text} |
-
-**净流向**: {net_flow:+.2f} 亿
-"""
-        return analysis.strip()
-
-    def _calculate_total_inflow(self, df, market_name: str = "") -> Optional[Dict]:
+        return _FLOW_TEMPLATE.format(
+            trend_emoji=trend_emoji,
+            trend=trend,
+            total_inflow=total_inflow,
+            total_outflow=inflow['total_outflow'],
+            inflow_sectors=inflow['inflow_sectors'],
+            outflow_sectors=inflow['outflow_sectors'],
+            concentration=concentration_text,
+            net_flow=net_flow
+        )
+
+    def _calculate_total_inflow(self, df, market_name: str = "",
+                                inflow_col: Optional[str] = None) -> Optional[Dict]:
         """计算市场整体资金流向统计
 
         Args:
             df: 板块数据
             market_name: 市场名称，用于确定单位转换因子
+            inflow_col: 可选，已解析的净流入列名，未传入时自动查找
 
         Returns:
             Dict: 资金流向统计
         """
         try:
-            df = df.copy()
-            inflow_col = None
-
             # 查找净流入列
-            for col in ['main_inflow', 'super_large_inflow', '今日主力净流入-净额', '今日超大单净流入-净额']:
-                if col in df.columns:
-                    inflow_col = col
-                    break
+            if inflow_col is None:
+                inflow_col = _resolve_inflow_col(df)
 
             if not inflow_col:
                 return None
 
+            # 直接在局部数组上计算，不复制DataFrame
+            arr = df[inflow_col].to_numpy(dtype='float64', na_value=np.nan)
+
             # 根据市场类型确定单位转换因子
             # A股: 原始数据是分，除以 1e8 得到亿元
             # 美股/港股: 原始数据是价格*股数(美元/港币)，通常已经是合理数值，除以 1e4 得到亿元(假设)
@@ -296,7 +375,7 @@ class ReportGenerator:
                 divisor = 1e8  # 分 -> 亿元
             else:
                 # 美股/港股：数值通常较小，检查中位数判断
-                median_val = df[inflow_col].abs().median()
+                median_val = np.nanmedian(np.abs(arr)) if arr.size else np.nan
                 if median_val < 1e6:  # 如果中位数小于100万，可能是已经处理过的值
                     divisor = 1e4  # 假设单位是万元
                 elif median_val > 1e8:  # 如果中位数大于1亿，可能是原始分
@@ -305,18 +384,24 @@ class ReportGenerator:
                     divisor = 1e6  # 默认转换为百万元
 
             # 转换单位为亿元
-            df['inflow_yi'] = df[inflow_col] / divisor
-
-            # 计算统计
-            total_inflow = df[df['inflow_yi'] > 0]['inflow_yi'].sum()
-            total_outflow = df[df['inflow_yi'] < 0]['inflow_yi'].sum()
+            arr = arr / divisor
+
+            # 计算统计，NaN在比较中为False，自然被排除
+            pos = arr > 0
+            neg = arr < 0
+            pos_vals = arr[pos]
+            total_inflow = pos_vals.sum()
+            total_outflow = arr[neg].sum()
             net_flow = total_inflow + total_outflow
 
-            inflow_sectors = (df['inflow_yi'] > 0).sum()
-            outflow_sectors = (df['inflow_yi'] < 0).sum()
+            inflow_sectors = int(pos.sum())
+            outflow_sectors = int(neg.sum())
 
-            # 计算前5大流入
-            top5_inflow = df[df['inflow_yi'] > 0].nlargest(5, 'inflow_yi')['inflow_yi'].sum()
+            # 计算前5大流入，partition为O(n)，无需排序
+            if pos_vals.size <= 5:
+                top5_inflow = pos_vals.sum()
+            else:
+                top5_inflow = np.partition(pos_vals, -5)[-5:].sum()
 
             return {
                 'total_inflow': total_inflow,
@@ -331,22 +416,24 @@ class ReportGenerator:
             self.logger.error(f"计算资金流向失败: {e}")
             return None
 
-    def _get_inflow_value(self, row) -> float:
-        """从行数据中提取净流入值（转换为亿元）"""
-        inflow = 0
-
-        # 尝试各种可能的列名
-        for col in ['main_inflow', 'super_large_inflow', '今日主力净流入-净额', '今日超大单净流入-净额']:
-            if col in row and pd.notna(row[col]) and row[col] != 0:
-                val = row[col]
-                # 判断单位：如果是美股/港股的估算值，通常较小
-                if abs(val) < 1000000:  # 小于100万，可能是每股价格*股数
-                    inflow = val / 1e4  # 转换为亿元（简化）
-                else:
-                    inflow = val / 1e8  # A股单位是分，转换为亿元
-                break
+    def _attach_inflow_column(self, df: pd.DataFrame) -> pd.DataFrame:
+        """计算每行净流入（亿元），返回带 inflow_yi 列的新DataFrame
 
-        return inflow
+        按候选列优先级取第一个非空且非零的值；小于100万视为美股/港股估算值（除以1e4），
+        否则视为A股分（除以1e8）
+        """
+        raw = np.zeros(len(df))
+        unset = np.ones(len(df), dtype=bool)
+        for col in _INFLOW_COLUMNS:
+            if col not in df.columns:
+                continue
+            arr = df[col].to_numpy(dtype='float64', na_value=0.0)
+            take = unset & (arr != 0)
+            raw = np.where(take, arr, raw)
+            unset &= ~take
+
+        inflow_yi = np.where(np.abs(raw) < 1e6, raw / 1e4, raw / 1e8)
+        return df.assign(inflow_yi=inflow_yi)
 
     def generate_summary(self, ranking_df: pd.DataFrame) -> str:
         """生成简短摘要（用于日志）
@@ -361,8 +448,8 @@ class ReportGenerator:
             return "无数据"
 
         top3 = []
-        for idx, row in ranking_df.head(3).iterrows():
-            sector_name = row.get('sector_name', row.get('name', f'板块{idx+1}'))
+        for row in _iter_rows(ranking_df.head(3)):
+            sector_name = _first_valid(row, ('sector_name', 'name'), f'板块{row.Index+1}')
             top3.append(sector_name)
 
         return f"TOP3: {' > '.join(top3)}"
@@ -378,18 +465,12 @@ class ReportGenerator:
         """
         summaries = []
 
-        market_names = {
-            'a_share': 'A股',
-            'us': '美股',
-            'hk': '港股'
-        }
-
         for market, result in market_results.items():
             if result.get('success') and result.get('top10') is not None:
-                market_name = market_names.get(market, market)
+                market_name = _MARKET_NAMES.get(market, market)
                 top3 = []
-                for idx, row in result['top10'].head(3).iterrows():
-                    sector = row.get('sector_name', row.get('name', f'板块{idx+1}'))
+                for row in _iter_rows(result['top10'].head(3)):
+                    sector = _first_valid(row, ('sector_name', 'name'), f'板块{row.Index+1}')
                     top3.append(sector)
                 summaries.append(f"{market_name}: {' > '.join(top3)}")
 
@@ -406,15 +487,11 @@ class ReportGenerator:
         Returns:
             str: Markdown 格式的报告
         """
-        from datetime import datetime
-        
-        market_names = {'a_share': 'A股', 'us': '美股', 'hk': '港股'}
         if market_display_name is None:
-            market_display_name = market_names.get(market, market)
+            market_display_name = _MARKET_NAMES.get(market, market)
         
         # 市场 emoji
-        market_emojis = {'a_share': '🇨🇳', 'us': '🇺🇸', 'hk': '🇭🇰'}
-        emoji = market_emojis.get(market, '📊')
+        emoji = _MARKET_EMOJIS.get(market, '📊')
         
         lines = []
         lines.append(f"# {emoji} {market_display_name}板块资金流向")
@@ -427,10 +504,11 @@ class ReportGenerator:
             lines.append("## 🔥 TOP10 板块排名")
             lines.append("")
             
-            for idx, row in result['top10'].iterrows():
-                sector = row.get('sector_name', row.get('name', f'板块{idx+1}'))
-                change = row.get('change_pct', 0)
-                inflow = row.get('main_inflow', 0)
+            for row in _iter_rows(result['top10']):
+                idx = row.Index
+                sector = _first_valid(row, ('sector_name', 'name'), f'板块{idx+1}')
+                change = _first_valid(row, ('change_pct',), 0)
+                inflow = _first_valid(row, ('main_inflow',), 0)
                 
                 # 单位转换
                 if market == 'a_share':
@@ -438,7 +516,7 @@ class ReportGenerator:
                 else:
                     inflow_display = self._format_inflow_value(inflow)
                 
-                symbol = row.get('symbol', '')
+                symbol = _first_valid(row, ('symbol',), '')
                 symbol_str = f" ({symbol})" if symbol else ""
                 
                 lines.append(f"{idx+1}. **{sector}**{symbol_str} - {inflow_display} ({change:+.2f}%)")
@@ -9,7 +9,7 @@ import asyncio
 from datetime import datetime
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 from .data_fetchers import DataFetcherFactory, MarketType, BaseDataFetcher
 from .analyzer import SectorAnalyzer
@@ -48,7 +48,7 @@ class MonitorScheduler:
         self.schedule_time = schedule_time
         
         self.scheduler = AsyncIOScheduler()
-        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger = logger
         
         # 解析时间 (格式: HH:MM)
         try:
@@ -105,49 +105,37 @@ class MonitorScheduler:
             chart_files = []
             if self.chart_generator:
                 self.logger.info("步骤 5/6: 生成时间序列图表...")
-                try:
-                    # 生成TOP板块趋势图
-                    trend_chart = self.chart_generator.generate_top_sectors_trend(top_n=5, days=14)
-                    if trend_chart:
-                        chart_files.append(trend_chart)
-                    
-                    # 生成热力图（如果有足够数据）
-                    heatmap_chart = self.chart_generator.generate_market_heatmap(days=5)
-                    if heatmap_chart:
-                        chart_files.append(heatmap_chart)
-                    
-                    # 清理旧图表
-                    self.chart_generator.cleanup_old_charts(keep_days=7)
-                    
-                except Exception as e:
-                    self.logger.warning(f"生成图表失败: {e}")
+                # matplotlib绘图是CPU密集的同步调用，放到工作线程避免阻塞事件循环
+                chart_files = await asyncio.to_thread(self._generate_charts)
             
             # 6. 上传图表到图床（如果配置了）
             chart_urls = []
             if self.image_uploader and chart_files:
                 self.logger.info("上传图表到图床...")
-                for chart_file in chart_files:
-                    url = self.image_uploader.upload_to_imgur(chart_file)
-                    if url:
-                        chart_urls.append(url)
+                # 保持与chart_files一一对应，失败项为None；上传完成后关闭aiohttp会话，避免连接泄漏
+                try:
+                    chart_urls = await self.image_uploader.upload_many(chart_files)
+                finally:
+                    await self.image_uploader.aclose()
             
             # 7. 生成并发送报告
             self.logger.info("步骤 7/7: 生成并发送报告...")
             report = self.reporter.generate_markdown(top10_df, rotation_signals)
             
-            # 根据输出模式选择发送方式
-            if self.output_mode in ("telegram", "both") and self.notifier:
-                await self.notifier.send_report(report)
+            # 根据输出模式选择发送方式，Telegram与Notion并发发送
+            title = f"板块资金流向监控 - {today}"
+            db_id = getattr(self.notion_writer, 'database_id', None)
+            results = await self._dispatch_report(
+                title, report,
+                database_id=db_id,
+                chart_files=chart_files,
+                chart_urls=chart_urls
+            )
             
-            if self.output_mode in ("notion", "both") and self.notion_writer:
-                title = f"板块资金流向监控 - {today}"
-                db_id = getattr(self.notion_writer, 'database_id', None)
-                self.notion_writer.write_report(
-                    title, report, 
-                    database_id=db_id, 
-                    chart_files=chart_files,
-                    chart_urls=chart_urls
-                )
+            # 两路都已结束后再抛出首个异常，避免一路失败中断另一路
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
             
             self.logger.info("=== 任务执行完成 ===")
             return True
@@ -157,17 +145,67 @@ class MonitorScheduler:
             
             # 发送错误通知
             error_msg = f"❌ 监控任务执行失败\n\n错误信息: {str(e)}\n时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            try:
-                if self.output_mode in ("telegram", "both") and self.notifier:
-                    await self.notifier.send_report(error_msg)
-                if self.output_mode in ("notion", "both") and self.notion_writer:
-                    title = f"监控异常 - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-                    self.notion_writer.write_report(title, error_msg)
-            except:
-                pass
+            title = f"监控异常 - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+            for result in await self._dispatch_report(title, error_msg):
+                if isinstance(result, Exception):
+                    self.logger.warning(f"发送错误通知失败: {result}")
                 
             return False
     
+    async def _dispatch_report(self, title: str, report: str, **notion_kwargs) -> list:
+        """
+        按输出模式并发发送报告到Telegram和Notion
+        
+        Notion写入是阻塞的HTTP调用，放到工作线程与Telegram发送并行执行
+        
+        Args:
+            title: Notion页面标题
+            report: 报告内容
+            **notion_kwargs: 透传给 NotionWriter.write_report 的参数
+            
+        Returns:
+            list: 各路发送结果，失败项为异常对象
+        """
+        tasks = []
+        if self.output_mode in ("telegram", "both") and self.notifier:
+            tasks.append(self.notifier.send_report(report))
+        
+        if self.output_mode in ("notion", "both") and self.notion_writer:
+            tasks.append(asyncio.to_thread(
+                self.notion_writer.write_report, title, report, **notion_kwargs
+            ))
+        
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _generate_charts(self) -> List[str]:
+        """
+        生成趋势图和热力图，并清理旧图表
+        
+        pyplot的当前图形是全局状态，两张图在同一线程内依次生成
+        
+        Returns:
+            List[str]: 生成成功的图表文件路径
+        """
+        chart_files = []
+        try:
+            # 生成TOP板块趋势图
+            trend_chart = self.chart_generator.generate_top_sectors_trend(top_n=5, days=14)
+            if trend_chart:
+                chart_files.append(trend_chart)
+            
+            # 生成热力图（如果有足够数据）
+            heatmap_chart = self.chart_generator.generate_market_heatmap(days=5)
+            if heatmap_chart:
+                chart_files.append(heatmap_chart)
+            
+            # 清理旧图表
+            self.chart_generator.cleanup_old_charts(keep_days=7)
+            
+        except Exception as e:
+            self.logger.warning(f"生成图表失败: {e}")
+        
+        return chart_files
+    
     def start(self):
         """启动定时调度（交易日运行）"""
         self.logger.info(f"启动定时调度器，每日 {self.schedule_time} 执行（工作日）")
@@ -1,57 +1,89 @@
 """测试Fixtures - 提供模拟数据和mock对象"""
 import pytest
+import numpy as np
 import pandas as pd
 import os
 import sys
 from datetime import datetime
-from unittest.mock import MagicMock, AsyncMock, patch
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, AsyncMock, patch
+from pytest_asyncio import is_async_test
 
 # 设置测试环境变量
 os.environ['TELEGRAM_BOT_TOKEN'] = 'test_token_for_unit_tests'
 os.environ['TELEGRAM_CHAT_ID'] = '123456789'
 
-# 添加src到Python路径
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# 添加项目根目录到Python路径（pytest.ini 已配置 pythonpath，此处兼容其他方式运行）
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 from src.config import Settings
-from src.data_fetchers import BaseDataFetcher
-from src.analyzer import SectorAnalyzer
-from src.reporter import ReportGenerator
-from src.notifier import TelegramNotifier
-from src.scheduler import MonitorScheduler
 
 
-@pytest.fixture
+def pytest_collection_modifyitems(items):
+    """所有异步测试共用一个session级事件循环，避免每个测试创建/关闭事件循环
+
+    pytest-asyncio 0.23 没有 asyncio_default_fixture_loop_scope 配置项，
+    通过给异步测试加 session 作用域的 asyncio 标记实现（asyncio_mode=auto 下无需再手写标记）
+    """
+    session_scope_marker = pytest.mark.asyncio(scope="session")
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(session_scope_marker, append=False)
+
+
+# 纯数据fixture为session级共享，测试中不要原地修改，需要修改时先 .copy()
+def _shared_frame(data: dict) -> pd.DataFrame:
+    """构建session共享的只读数据帧
+
+    保持默认的NumPy dtype：生产代码从akshare/yfinance拿到的都是NumPy后端的数据帧，
+    测试数据需与之一致（Arrow后端在 pd.NA、to_numpy 等处行为不同）
+    """
+    return pd.DataFrame(data, copy=False)
+
+
+# 板块资金流数值列，预先构建为定型数组，避免每次构建DataFrame时推断dtype
+_SECTOR_NAMES = ['半导体', '电池', '光伏', '电力', '有色',
+                 '银行', '证券', '保险', '白酒', '医药']
+_MAIN_INFLOW = np.array([500000000, 400000000, 300000000, 250000000, 200000000,
+                         -100000000, -150000000, -200000000, -250000000, -300000000], dtype=np.int64)
+_MAIN_INFLOW_PCT = np.array([5.0, 4.0, 3.0, 2.5, 2.0,
+                             -1.0, -1.5, -2.0, -2.5, -3.0], dtype=np.float64)
+_SUPER_LARGE_INFLOW = np.array([300000000, 200000000, 150000000, 100000000, 80000000,
+                                -50000000, -80000000, -100000000, -120000000, -150000000], dtype=np.int64)
+_CHANGE_PCT = np.array([3.5, 2.8, 2.1, 1.8, 1.5,
+                        -0.5, -0.8, -1.0, -1.2, -1.5], dtype=np.float64)
+
+# 原始格式（中文列名）板块资金流数据，模块导入时构建一次
+_RAW_SECTOR_DF = _shared_frame({
+    '名称': _SECTOR_NAMES,
+    '今日主力净流入-净额': _MAIN_INFLOW,
+    '今日主力净流入-净占比': _MAIN_INFLOW_PCT,
+    '今日超大单净流入-净额': _SUPER_LARGE_INFLOW,
+    '今日涨跌幅': _CHANGE_PCT,
+})
+
+# 中文列名 -> 标准化列名
+_CN_TO_EN = {
+    '名称': 'sector_name',
+    '今日主力净流入-净额': 'main_inflow',
+    '今日主力净流入-净占比': 'main_inflow_pct',
+    '今日超大单净流入-净额': 'super_large_inflow',
+    '今日涨跌幅': 'change_pct',
+}
+
+
+@pytest.fixture(scope="session")
 def mock_sector_data():
-    """提供模拟的板块资金流数据"""
-    return pd.DataFrame({
-        'sector_name': ['半导体', '电池', '光伏', '电力', '有色', 
-                        '银行', '证券', '保险', '白酒', '医药'],
-        'main_inflow': [500000000, 400000000, 300000000, 250000000, 200000000,
-                       -100000000, -150000000, -200000000, -250000000, -300000000],
-        'main_inflow_pct': [5.0, 4.0, 3.0, 2.5, 2.0, 
-                           -1.0, -1.5, -2.0, -2.5, -3.0],
-        'super_large_inflow': [300000000, 200000000, 150000000, 100000000, 80000000,
-                              -50000000, -80000000, -100000000, -120000000, -150000000],
-        'change_pct': [3.5, 2.8, 2.1, 1.8, 1.5,
-                      -0.5, -0.8, -1.0, -1.2, -1.5],
-    })
+    """提供模拟的板块资金流数据（与原始数据共享底层数据，仅列名不同）"""
+    return _RAW_SECTOR_DF.rename(columns=_CN_TO_EN, copy=False)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_sector_data_raw():
     """提供原始格式（中文列名）的板块资金流数据"""
-    return pd.DataFrame({
-        '名称': ['半导体', '电池', '光伏', '电力', '有色', 
-                '银行', '证券', '保险', '白酒', '医药'],
-        '今日主力净流入-净额': [500000000, 400000000, 300000000, 250000000, 200000000,
-                              -100000000, -150000000, -200000000, -250000000, -300000000],
-        '今日主力净流入-净占比': [5.0, 4.0, 3.0, 2.5, 2.0, 
-                                -1.0, -1.5, -2.0, -2.5, -3.0],
-        '今日超大单净流入-净额': [300000000, 200000000, 150000000, 100000000, 80000000,
-                               -50000000, -80000000, -100000000, -120000000, -150000000],
-        '今日涨跌幅': [3.5, 2.8, 2.1, 1.8, 1.5,
-                     -0.5, -0.8, -1.0, -1.2, -1.5],
-    })
+    return _RAW_SECTOR_DF
 
 
 @pytest.fixture
@@ -60,10 +92,10 @@ def empty_dataframe():
     return pd.DataFrame()
 
 
-@pytest.fixture
-def temp_data_dir(tmp_path):
-    """提供临时数据目录"""
-    return tmp_path / "test_data"
+@pytest.fixture(scope="module")
+def temp_data_dir(tmp_path_factory):
+    """提供临时数据目录（模块内共享，快照测试使用确定的文件名）"""
+    return tmp_path_factory.mktemp("test_data")
 
 
 @pytest.fixture
@@ -75,22 +107,27 @@ def mock_settings():
     )
 
 
-@pytest.fixture
-def mock_telegram_bot():
-    """提供模拟的Telegram Bot"""
-    bot = MagicMock()
-    bot.send_message = AsyncMock(return_value=True)
-    return bot
+@pytest.fixture(scope="session")
+def _telegram_bot():
+    """session级共享的Telegram Bot桩对象，只提供 send_message"""
+    return SimpleNamespace(send_message=AsyncMock(return_value=True))
 
 
 @pytest.fixture
+def mock_telegram_bot(_telegram_bot):
+    """提供模拟的Telegram Bot（每个测试前重置调用记录）"""
+    _telegram_bot.send_message.reset_mock()
+    return _telegram_bot
+
+
+@pytest.fixture(scope="session")
 def mock_akshare_data():
     """提供mock的akshare返回数据"""
-    return pd.DataFrame({
-        '名称': ['半导体', '电池', '光伏', '电力', '有色'],
-        '今日主力净流入-净额': [500000000, 400000000, 300000000, 250000000, 200000000],
-        '今日主力净流入-净占比': [5.0, 4.0, 3.0, 2.5, 2.0],
-        '今日涨跌幅': [3.5, 2.8, 2.1, 1.8, 1.5],
+    return _shared_frame({
+        '名称': _SECTOR_NAMES[:5],
+        '今日主力净流入-净额': _MAIN_INFLOW[:5],
+        '今日主力净流入-净占比': _MAIN_INFLOW_PCT[:5],
+        '今日涨跌幅': _CHANGE_PCT[:5],
     })
 
 
@@ -103,21 +140,50 @@ def sample_rotation_signals():
     ]
 
 
+class _Stub:
+    """轻量桩对象：__slots__ 中的每个方法绑定一个 Mock，比 MagicMock 分配更快，且不接受未声明的属性"""
+    __slots__ = ()
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, Mock())
+
+
+class _DataFetcherStub(_Stub):
+    __slots__ = ('get_sector_data',)
+
+
+class _AnalyzerStub(_Stub):
+    __slots__ = ('rank_by_inflow', 'save_snapshot', 'get_last_trading_date',
+                 'load_snapshot', 'detect_rotation')
+
+
+class _ReporterStub(_Stub):
+    __slots__ = ('generate_summary', 'generate_markdown')
+
+
+class _NotifierStub:
+    __slots__ = ('send_report',)
+
+    def __init__(self):
+        self.send_report = AsyncMock(return_value=True)
+
+
 @pytest.fixture
 def mock_scheduler_components():
-    """提供模拟的调度器组件"""
+    """提供模拟的调度器组件（仅包含MonitorScheduler实际调用的方法）"""
     return {
-        'data_fetcher': MagicMock(spec=BaseDataFetcher),
-        'analyzer': MagicMock(spec=SectorAnalyzer),
-        'reporter': MagicMock(spec=ReportGenerator),
-        'notifier': MagicMock(spec=TelegramNotifier),
+        'data_fetcher': _DataFetcherStub(),
+        'analyzer': _AnalyzerStub(),
+        'reporter': _ReporterStub(),
+        'notifier': _NotifierStub(),
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_us_sector_data():
     """提供模拟的美股Sector ETF数据"""
-    return pd.DataFrame({
+    return _shared_frame({
         'sector_name': ['Technology', 'Financials', 'Health Care', 'Consumer Discretionary'],
         'symbol': ['XLK', 'XLF', 'XLV', 'XLY'],
         'change_pct': [2.5, 1.8, -0.5, 1.2],
@@ -127,10 +193,10 @@ def mock_us_sector_data():
     })
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_hk_sector_data():
     """提供模拟的港股板块数据"""
-    return pd.DataFrame({
+    return _shared_frame({
         'sector_name': ['恒生科技', '恒生金融', '恒生地产'],
         'symbol': ['3033.HK', '2828.HK', '2801.HK'],
         'change_pct': [1.8, -0.5, 2.0],
@@ -140,13 +206,13 @@ def mock_hk_sector_data():
     })
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def multi_market_results():
     """提供多市场测试结果数据"""
     return {
         'a_share': {
             'success': True,
-            'top10': pd.DataFrame({
+            'top10': _shared_frame({
                 'sector_name': ['半导体', '电池'],
                 'change_pct': [3.5, 2.8],
                 'main_inflow': [500000000, 400000000],
@@ -156,7 +222,7 @@ def multi_market_results():
         },
         'us': {
             'success': True,
-            'top10': pd.DataFrame({
+            'top10': _shared_frame({
                 'sector_name': ['Technology', 'Financials'],
                 'symbol': ['XLK', 'XLF'],
                 'change_pct': [2.5, 1.8],
@@ -167,7 +233,7 @@ def multi_market_results():
         },
         'hk': {
             'success': True,
-            'top10': pd.DataFrame({
+            'top10': _shared_frame({
                 'sector_name': ['恒生科技', '恒生地产'],
                 'symbol': ['3033.HK', '2801.HK'],
                 'change_pct': [1.8, 2.0],
@@ -6,10 +6,41 @@ from datetime import datetime
 from src.analyzer import SectorAnalyzer
 
 
+# 轮动检测用例: (今日数据, 昨日数据, 预期新进入的板块)
+_ROTATION_CASES = [
+    pytest.param(
+        pd.DataFrame({
+            'sector_name': ['A', 'B', 'C', 'D'],
+            'main_inflow': [100, 90, 80, 70],
+        }),
+        pd.DataFrame({
+            'sector_name': ['B', 'C', 'E', 'F'],
+            'main_inflow': [100, 90, 80, 70],
+            'rank': [1, 2, 3, 4],
+        }),
+        ['A', 'D'],
+        id='sector_name_column',
+    ),
+    pytest.param(
+        # 使用'name'列而非'sector_name'
+        pd.DataFrame({
+            'name': ['A', 'B', 'C'],
+            'main_inflow': [100, 90, 80],
+        }),
+        pd.DataFrame({
+            'name': ['B', 'C', 'D'],
+            'main_inflow': [100, 90, 80],
+        }),
+        ['A'],
+        id='name_column',
+    ),
+]
+
+
 class TestSectorAnalyzer:
     """SectorAnalyzer板块分析器测试"""
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def analyzer(self, temp_data_dir):
         return SectorAnalyzer(data_path=str(temp_data_dir))
     
@@ -61,86 +92,36 @@ class TestSectorAnalyzer:
         assert len(result) == 3
         assert result.iloc[0]['净流入金额'] == 200
     
-    def test_detect_rotation_normal(self, analyzer):
-        """测试正常轮动检测"""
-        today_df = pd.DataFrame({
-            'sector_name': ['A', 'B', 'C', 'D'],
-            'main_inflow': [100, 90, 80, 70],
-        })
-        
-        yesterday_df = pd.DataFrame({
-            'sector_name': ['B', 'C', 'E', 'F'],
-            'main_inflow': [100, 90, 80, 70],
-            'rank': [1, 2, 3, 4],
-        })
-        
-        signals = analyzer.detect_rotation(today_df, yesterday_df)
-        
-        # A和D是新进入TOP4的
-        assert len(signals) == 2
-        sector_names = [s['sector_name'] for s in signals]
-        assert 'A' in sector_names
-        assert 'D' in sector_names
-    
-    def test_detect_rotation_empty_today(self, analyzer, mock_sector_data, empty_dataframe):
-        """测试今日数据为空"""
-        signals = analyzer.detect_rotation(empty_dataframe, mock_sector_data)
-        
-        assert len(signals) == 0
-    
-    def test_detect_rotation_empty_yesterday(self, analyzer, mock_sector_data):
-        """测试昨日数据为空"""
-        signals = analyzer.detect_rotation(mock_sector_data, pd.DataFrame())
-        
-        assert len(signals) == 0
-    
-    def test_detect_rotation_none_inputs(self, analyzer):
-        """测试None输入"""
-        signals = analyzer.detect_rotation(None, None)
-        
-        assert len(signals) == 0
-    
-    def test_detect_rotation_use_name_column(self, analyzer):
-        """测试使用'name'列而非'sector_name'"""
-        today_df = pd.DataFrame({
-            'name': ['A', 'B', 'C'],
-            'main_inflow': [100, 90, 80],
-        })
-        
-        yesterday_df = pd.DataFrame({
-            'name': ['B', 'C', 'D'],
-            'main_inflow': [100, 90, 80],
-        })
-        
+    @pytest.mark.parametrize("today_df, yesterday_df, expected", _ROTATION_CASES)
+    def test_detect_rotation(self, analyzer, today_df, yesterday_df, expected):
+        """测试轮动检测：今日新进入排名的板块"""
         signals = analyzer.detect_rotation(today_df, yesterday_df)
         
-        assert len(signals) == 1
-        assert signals[0]['sector_name'] == 'A'
+        assert sorted(s['sector_name'] for s in signals) == expected
     
-    def test_save_snapshot_success(self, analyzer, mock_sector_data):
-        """测试数据保存成功"""
-        file_path = analyzer.save_snapshot(mock_sector_data, '2024-02-15')
+    @pytest.mark.parametrize("today_fixture, yesterday_fixture", [
+        pytest.param('empty_dataframe', 'mock_sector_data', id='empty_today'),
+        pytest.param('mock_sector_data', 'empty_dataframe', id='empty_yesterday'),
+        pytest.param(None, None, id='none_inputs'),
+    ])
+    def test_detect_rotation_missing_data(self, analyzer, request, today_fixture, yesterday_fixture):
+        """测试今日/昨日数据为空或为None时无轮动信号"""
+        today_df = request.getfixturevalue(today_fixture) if today_fixture else None
+        yesterday_df = request.getfixturevalue(yesterday_fixture) if yesterday_fixture else None
         
-        assert os.path.exists(file_path)
-        assert 'sector_flow_20240215.csv' in file_path
-        
-        # 验证文件内容
-        loaded_df = pd.read_csv(file_path)
-        assert len(loaded_df) == 10
+        assert analyzer.detect_rotation(today_df, yesterday_df) == []
     
-    def test_save_snapshot_dash_date(self, analyzer, mock_sector_data):
-        """测试带横线的日期格式"""
-        file_path = analyzer.save_snapshot(mock_sector_data, '2024-02-15')
+    @pytest.mark.parametrize("date_str", ['2024-02-15', '20240215'])
+    def test_save_snapshot(self, analyzer, mock_sector_data, date_str):
+        """测试数据保存成功（带/不带横线的日期格式）"""
+        file_path = analyzer.save_snapshot(mock_sector_data, date_str)
         
         assert os.path.exists(file_path)
         assert 'sector_flow_20240215.csv' in file_path
-    
-    def test_save_snapshot_no_dash_date(self, analyzer, mock_sector_data):
-        """测试不带横线的日期格式"""
-        file_path = analyzer.save_snapshot(mock_sector_data, '20240215')
         
-        assert os.path.exists(file_path)
-        assert 'sector_flow_20240215.csv' in file_path
+        # 验证文件行数（10行数据 + 表头），无需完整解析CSV
+        with open(file_path, 'rb') as f:
+            assert f.read().count(b'\n') == 11
     
     def test_load_snapshot_success(self, analyzer, mock_sector_data):
         """测试数据加载成功"""
@@ -174,26 +155,16 @@ class TestSectorAnalyzer:
         assert isinstance(result, pd.DataFrame)
         assert len(result) == 1  # 有一行数据
     
-    def test_get_last_trading_date_weekday(self, analyzer):
-        """测试工作日获取上一个交易日"""
-        # 周三 (2024-02-14)
-        result = analyzer.get_last_trading_date('2024-02-14')
-        
-        assert result == '2024-02-13'
-    
-    def test_get_last_trading_date_monday(self, analyzer):
-        """测试周一获取上一个交易日（应跳过周末）"""
-        # 周一 (2024-02-12)
-        result = analyzer.get_last_trading_date('2024-02-12')
-        
-        assert result == '2024-02-09'
-    
-    def test_get_last_trading_date_sunday(self, analyzer):
-        """测试周日（非正常交易日，但测试逻辑）"""
-        # 周日 (2024-02-11)
-        result = analyzer.get_last_trading_date('2024-02-11')
-        
-        assert result == '2024-02-09'
+    @pytest.mark.parametrize("day, expected", [
+        pytest.param('2024-02-14', '2024-02-13', id='wednesday'),
+        # 周一应跳过周末
+        pytest.param('2024-02-12', '2024-02-09', id='monday'),
+        # 周日（非正常交易日，但测试逻辑）
+        pytest.param('2024-02-11', '2024-02-09', id='sunday'),
+    ])
+    def test_get_last_trading_date(self, analyzer, day, expected):
+        """测试获取上一个交易日"""
+        assert analyzer.get_last_trading_date(day) == expected
     
     def test_duplicate_data_handling(self, analyzer):
         """测试重复数据处理"""
@@ -5,31 +5,40 @@ import numpy as np
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 import os
-import tempfile
-import shutil
 
-import sys
-sys.path.insert(0, '/Users/yidazhou/.openclaw/workspace/stock-monitor')
 
-from src.chart_generator import ChartGenerator
+@pytest.fixture(scope="session")
+def chart_generator_cls():
+    """延迟导入ChartGenerator：仅在用到时加载matplotlib，并固定使用无界面的Agg后端"""
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("Agg")
+    from src.chart_generator import ChartGenerator
+    return ChartGenerator
+
+
+@pytest.fixture(autouse=True)
+def close_figures():
+    """每个测试后关闭所有图形，避免matplotlib图形注册表随测试数量增长"""
+    yield
+    import matplotlib.pyplot as plt
+    plt.close("all")
 
 
 class TestChartGenerator:
     """测试图表生成器"""
     
-    @pytest.fixture
-    def temp_dirs(self):
-        """创建临时目录"""
-        data_dir = tempfile.mkdtemp()
-        charts_dir = tempfile.mkdtemp()
-        yield {'data': data_dir, 'charts': charts_dir}
-        shutil.rmtree(data_dir, ignore_errors=True)
-        shutil.rmtree(charts_dir, ignore_errors=True)
+    @pytest.fixture(scope="module")
+    def temp_dirs(self, tmp_path_factory):
+        """创建临时目录（模块内共享，由pytest负责清理）"""
+        return {
+            'data': tmp_path_factory.mktemp('cg_data'),
+            'charts': tmp_path_factory.mktemp('cg_charts'),
+        }
     
-    @pytest.fixture
-    def chart_gen(self, temp_dirs):
+    @pytest.fixture(scope="class")
+    def chart_gen(self, temp_dirs, chart_generator_cls):
         """创建图表生成器实例"""
-        return ChartGenerator(
+        return chart_generator_cls(
             data_path=temp_dirs['data'],
             charts_path=temp_dirs['charts']
         )
@@ -44,50 +53,47 @@ class TestChartGenerator:
             'symbol': ['000001', '000002', '000003', '000004', '000005']
         })
     
-    @pytest.fixture
-    def sample_us_data(self):
-        """美股示例数据"""
-        return pd.DataFrame({
-            'sector_name': ['Technology', 'Financials', 'Healthcare'],
-            'change_pct': [2.5, 1.8, -0.5],
-            'main_inflow': [5000000, 3000000, -1000000],
-            'symbol': ['XLK', 'XLF', 'XLV']
-        })
-    
     def test_chart_generator_init(self, chart_gen):
         """测试图表生成器初始化"""
         assert chart_gen.data_path is not None
         assert chart_gen.charts_path is not None
         assert os.path.exists(chart_gen.charts_path)
     
-    def test_generate_pie_charts_creation(self, chart_gen, sample_a_share_data):
-        """测试饼图生成方法存在"""
-        assert hasattr(chart_gen, 'generate_sector_flow_pie_charts')
+    @pytest.mark.parametrize("method_name", [
+        'generate_sector_flow_pie_charts',
+        'generate_market_flow_summary_chart',
+        'generate_top_sectors_trend',
+        'generate_market_top_sectors_trend',
+        'generate_sector_history_chart',
+        'generate_sector_comparison',
+        'generate_market_heatmap',
+        'load_historical_data',
+        'cleanup_old_charts',
+    ])
+    def test_public_methods_exist(self, chart_gen, method_name):
+        """测试图表生成方法存在"""
+        assert callable(getattr(chart_gen, method_name, None))
     
     def test_generate_market_flow_summary_chart(self, chart_gen, sample_a_share_data):
-        """测试摘要图表方法存在"""
-        assert hasattr(chart_gen, 'generate_market_flow_summary_chart')
-    
-    def test_generate_top_sectors_trend(self, chart_gen):
-        """测试TOP板块趋势图方法"""
-        assert hasattr(chart_gen, 'generate_top_sectors_trend')
-        assert hasattr(chart_gen, 'generate_market_top_sectors_trend')
-    
-    def test_load_historical_data(self, chart_gen):
-        """测试加载历史数据方法"""
-        assert hasattr(chart_gen, 'load_historical_data')
-    
-    def test_cleanup_old_charts(self, chart_gen):
-        """测试清理旧图表方法"""
-        assert hasattr(chart_gen, 'cleanup_old_charts')
-    
-    def test_generate_sector_comparison(self, chart_gen):
-        """测试板块对比图方法"""
-        assert hasattr(chart_gen, 'generate_sector_comparison')
-    
-    def test_generate_market_heatmap(self, chart_gen):
-        """测试市场热力图方法"""
-        assert hasattr(chart_gen, 'generate_market_heatmap')
+        """测试摘要图表：NaN按0处理，且不修改传入的DataFrame"""
+        sample_a_share_data.loc[3, 'main_inflow'] = np.nan
+        columns = list(sample_a_share_data.columns)
+        chart_file = chart_gen.generate_market_flow_summary_chart(sample_a_share_data, 'A股')
+        
+        assert chart_file and os.path.exists(chart_file)
+        assert list(sample_a_share_data.columns) == columns
+    
+    @pytest.mark.parametrize("data_fixture,market_name", [
+        ('mock_us_sector_data', '美股'),
+        ('mock_hk_sector_data', '港股'),
+    ])
+    def test_generate_sector_flow_pie_charts_non_a_share(self, chart_gen, request, data_fixture, market_name):
+        """测试美股/港股饼图：按数值范围确定转换因子并生成净流入、净流出饼图"""
+        df = request.getfixturevalue(data_fixture)
+        charts = chart_gen.generate_sector_flow_pie_charts(df, market_name)
+        
+        assert set(charts) == {'inflow', 'outflow'}
+        assert all(path and os.path.exists(path) for path in charts.values())
     
     def test_interpolate_none(self, chart_gen):
         """测试None值插值"""
@@ -106,19 +112,3 @@ class TestChartGenerator:
         # 检查文件是否创建
         expected_file = chart_gen.data_path / 'sector_flow_20260220.csv'
         assert expected_file.exists()
-    
-    def test_pie_chart_with_empty_data(self, chart_gen):
-        """测试空数据处理"""
-        empty_df = pd.DataFrame(columns=['sector_name', 'change_pct', 'main_inflow'])
-        
-        # 验证方法存在且可以调用
-        assert hasattr(chart_gen, 'generate_sector_flow_pie_charts')
-    
-    def test_trend_chart_with_single_sector(self, chart_gen):
-        """测试单板块趋势图"""
-        assert hasattr(chart_gen, 'generate_sector_history_chart')
-    
-    def test_chart_generator_with_us_data(self, chart_gen, sample_us_data):
-        """测试美股数据处理"""
-        # 验证方法存在
-        assert hasattr(chart_gen, 'generate_sector_flow_pie_charts')
@@ -1,4 +1,5 @@
 """Config模块测试"""
+import functools
 import pytest
 import os
 from unittest.mock import patch
@@ -6,54 +7,53 @@ from pydantic import ValidationError
 from src.config import Settings
 
 
+# Telegram基础环境变量
+_BASE_ENV = (
+    ('TELEGRAM_BOT_TOKEN', 'token123'),
+    ('TELEGRAM_CHAT_ID', '123456'),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _settings(env: tuple) -> Settings:
+    """按环境变量组合缓存Settings实例，相同组合只解析校验一次（测试中只读使用）"""
+    with patch.dict(os.environ, dict(env)):
+        return Settings()
+
+
 class TestSettings:
     """Settings配置类测试"""
     
     def test_env_vars_loading(self):
         """测试环境变量加载"""
-        with patch.dict(os.environ, {
-            'TELEGRAM_BOT_TOKEN': 'my_token_123',
-            'TELEGRAM_CHAT_ID': '987654321'
-        }):
-            settings = Settings()
-            assert settings.TELEGRAM_BOT_TOKEN == 'my_token_123'
-            assert settings.TELEGRAM_CHAT_ID == '987654321'
+        settings = _settings((
+            ('TELEGRAM_BOT_TOKEN', 'my_token_123'),
+            ('TELEGRAM_CHAT_ID', '987654321'),
+        ))
+        assert settings.TELEGRAM_BOT_TOKEN == 'my_token_123'
+        assert settings.TELEGRAM_CHAT_ID == '987654321'
     
     def test_default_values(self):
         """测试默认值"""
-        with patch.dict(os.environ, {
-            'TELEGRAM_BOT_TOKEN': 'token123',
-            'TELEGRAM_CHAT_ID': '123456'
-        }):
-            settings = Settings()
-            # 测试默认值
-            assert settings.SCHEDULE_TIME == "15:05"
-            assert settings.DATA_PATH == "./data"
-            # 多市场默认配置
-            assert settings.ENABLED_MARKETS == "a_share,us,hk"
-            assert settings.A_SHARE_ENABLED == True
-            assert settings.US_ENABLED == True
-            assert settings.HK_ENABLED == True
+        settings = _settings(_BASE_ENV)
+        # 测试默认值
+        assert settings.SCHEDULE_TIME == "15:05"
+        assert settings.DATA_PATH == "./data"
+        # 多市场默认配置
+        assert settings.ENABLED_MARKETS == "a_share,us,hk"
+        assert settings.A_SHARE_ENABLED == True
+        assert settings.US_ENABLED == True
+        assert settings.HK_ENABLED == True
     
     def test_custom_schedule_time(self):
         """测试自定义调度时间"""
-        with patch.dict(os.environ, {
-            'TELEGRAM_BOT_TOKEN': 'token123',
-            'TELEGRAM_CHAT_ID': '123456',
-            'SCHEDULE_TIME': '14:30'
-        }):
-            settings = Settings()
-            assert settings.SCHEDULE_TIME == '14:30'
+        settings = _settings(_BASE_ENV + (('SCHEDULE_TIME', '14:30'),))
+        assert settings.SCHEDULE_TIME == '14:30'
     
     def test_custom_data_path(self):
         """测试自定义数据路径"""
-        with patch.dict(os.environ, {
-            'TELEGRAM_BOT_TOKEN': 'token123',
-            'TELEGRAM_CHAT_ID': '123456',
-            'DATA_PATH': '/custom/data/path'
-        }):
-            settings = Settings()
-            assert settings.DATA_PATH == '/custom/data/path'
+        settings = _settings(_BASE_ENV + (('DATA_PATH', '/custom/data/path'),))
+        assert settings.DATA_PATH == '/custom/data/path'
     
     def test_optional_telegram_config(self):
         """测试Telegram配置是可选的（支持Notion模式）
@@ -76,12 +76,11 @@ class TestSettings:
     
     def test_market_config_loading(self):
         """测试市场配置加载"""
-        with patch.dict(os.environ, {
-            'ENABLED_MARKETS': 'a_share,us',
-            'US_SCHEDULE_TIME': '07:00',
-            'HK_ENABLED': 'false',
-        }):
-            settings = Settings()
-            assert settings.ENABLED_MARKETS == "a_share,us"
-            assert settings.US_SCHEDULE_TIME == "07:00"
-            assert settings.HK_ENABLED == False
+        settings = _settings((
+            ('ENABLED_MARKETS', 'a_share,us'),
+            ('US_SCHEDULE_TIME', '07:00'),
+            ('HK_ENABLED', 'false'),
+        ))
+        assert settings.ENABLED_MARKETS == "a_share,us"
+        assert settings.US_SCHEDULE_TIME == "07:00"
+        assert settings.HK_ENABLED == False
@@ -2,12 +2,9 @@
 import pytest
 import pandas as pd
 from datetime import datetime
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, MagicMock
 
-# 需要添加项目根目录到路径
-import sys
-sys.path.insert(0, '/Users/yidazhou/.openclaw/workspace/stock-monitor')
-
 from src.data_fetchers import (
     DataFetcherFactory,
     MarketType,
@@ -16,7 +13,69 @@ from src.data_fetchers import (
 )
 from src.data_fetchers.a_share_fetcher import AShareDataFetcher
 from src.data_fetchers.us_market_fetcher import USMarketDataFetcher
-from src.data_fetchers.hk_market_fetcher import HKMarketDataFetcher
+from src.data_fetchers.hk_market_fetcher import HKMarketDataFetcher, HK_SECTOR_ETFS
+
+
+# 列名标准化用例: (akshare原始数据, 标准化后应包含的列)
+_NORMALIZE_CASES = [
+    pytest.param(
+        pd.DataFrame({
+            '名称': ['半导体', '白酒'],
+            '今日涨跌幅': [2.5, -1.2],
+            '今日主力净流入-净额': [100000000, -50000000],
+        }),
+        frozenset({'sector_name', 'change_pct', 'main_inflow'}),
+        id='today_prefix',
+    ),
+    pytest.param(
+        pd.DataFrame({
+            '名称': ['半导体', '白酒'],
+            '今日涨跌幅': [2.5, -1.2],
+            '主力净流入-净额': [100000000, -50000000],
+            '主力净流入-净占比': [5.0, -2.5],
+        }),
+        frozenset({'sector_name', 'change_pct', 'main_inflow', 'main_inflow_pct'}),
+        id='no_prefix',
+    ),
+]
+
+
+# akshare板块历史资金流原始数据（日期升序），模块导入时构建一次
+_HIST = pd.DataFrame({
+    '日期': pd.date_range('2024-02-01', periods=10, freq='B').strftime('%Y-%m-%d'),
+    '主力净流入-净额': [float(i) * 1e8 for i in range(10)],
+    '涨跌幅': [0.5] * 10,
+})
+
+
+@pytest.fixture(scope="module")
+def mock_historical_data():
+    """提供模拟的板块历史资金流数据（模块内共享，不要原地修改）"""
+    return _HIST
+
+
+@pytest.fixture(scope="module")
+def supported_markets():
+    """工厂支持的市场列表，模块内只查询一次"""
+    return DataFetcherFactory.get_supported_markets()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def mock_market_libs():
+    """整个模块只patch一次akshare/yfinance，测试中按需设置返回值"""
+    with patch('src.data_fetchers.a_share_fetcher.ak') as ak, \
+         patch('src.data_fetchers.us_market_fetcher.yf') as us_yf, \
+         patch('src.data_fetchers.hk_market_fetcher.yf') as hk_yf:
+        yield SimpleNamespace(ak=ak, us_yf=us_yf, hk_yf=hk_yf)
+
+
+@pytest.fixture(autouse=True)
+def reset_fetcher_state(request):
+    """获取器实例在类内共享，每个测试前重置限速时间戳和缓存"""
+    if 'fetcher' in request.fixturenames:
+        fetcher = request.getfixturevalue('fetcher')
+        fetcher._last_request_time = 0
+        getattr(fetcher, '_cache', {}).clear()
 
 
 class TestDataFetcherFactory:
@@ -24,70 +83,54 @@ class TestDataFetcherFactory:
     
     def test_create_a_share(self):
         """测试创建A股获取器"""
-        with patch('src.data_fetchers.a_share_fetcher.ak'):
-            fetcher = DataFetcherFactory.create('a_share')
-            assert isinstance(fetcher, AShareDataFetcher)
-            assert fetcher.market_type == MarketType.A_SHARE
+        fetcher = DataFetcherFactory.create('a_share')
+        assert isinstance(fetcher, AShareDataFetcher)
+        assert fetcher.market_type == MarketType.A_SHARE
     
-    def test_create_a_share_aliases(self):
+    @pytest.mark.parametrize("alias", ['a_share', 'a', 'ashare', 'cn', 'china'])
+    def test_create_a_share_aliases(self, alias):
         """测试A股别名"""
-        with patch('src.data_fetchers.a_share_fetcher.ak'):
-            aliases = ['a_share', 'a', 'ashare', 'cn', 'china']
-            for alias in aliases:
-                fetcher = DataFetcherFactory.create(alias)
-                assert isinstance(fetcher, AShareDataFetcher)
+        assert isinstance(DataFetcherFactory.create(alias), AShareDataFetcher)
     
     def test_create_us(self):
         """测试创建美股获取器"""
-        with patch('src.data_fetchers.us_market_fetcher.yf'):
-            fetcher = DataFetcherFactory.create('us')
-            assert isinstance(fetcher, USMarketDataFetcher)
-            assert fetcher.market_type == MarketType.US
-            assert fetcher.sector_etfs == SECTOR_ETFS
+        fetcher = DataFetcherFactory.create('us')
+        assert isinstance(fetcher, USMarketDataFetcher)
+        assert fetcher.market_type == MarketType.US
+        assert fetcher.sector_etfs == SECTOR_ETFS
     
-    def test_create_us_aliases(self):
+    @pytest.mark.parametrize("alias", ['us', 'usa', 'american', 'america'])
+    def test_create_us_aliases(self, alias):
         """测试美股别名"""
-        with patch('src.data_fetchers.us_market_fetcher.yf'):
-            aliases = ['us', 'usa', 'american', 'america']
-            for alias in aliases:
-                fetcher = DataFetcherFactory.create(alias)
-                assert isinstance(fetcher, USMarketDataFetcher)
+        assert isinstance(DataFetcherFactory.create(alias), USMarketDataFetcher)
     
     def test_create_hk(self):
         """测试创建港股获取器"""
-        with patch('src.data_fetchers.hk_market_fetcher.yf'):
-            fetcher = DataFetcherFactory.create('hk')
-            assert isinstance(fetcher, HKMarketDataFetcher)
-            assert fetcher.market_type == MarketType.HK
+        fetcher = DataFetcherFactory.create('hk')
+        assert isinstance(fetcher, HKMarketDataFetcher)
+        assert fetcher.market_type == MarketType.HK
     
-    def test_create_hk_aliases(self):
+    @pytest.mark.parametrize("alias", ['hk', 'hongkong', 'hkg'])
+    def test_create_hk_aliases(self, alias):
         """测试港股别名"""
-        with patch('src.data_fetchers.hk_market_fetcher.yf'):
-            aliases = ['hk', 'hongkong', 'hkg']
-            for alias in aliases:
-                fetcher = DataFetcherFactory.create(alias)
-                assert isinstance(fetcher, HKMarketDataFetcher)
+        assert isinstance(DataFetcherFactory.create(alias), HKMarketDataFetcher)
     
     def test_create_invalid_market(self):
         """测试无效市场类型"""
         with pytest.raises(ValueError):
             DataFetcherFactory.create('invalid_market')
     
-    def test_get_supported_markets(self):
+    def test_get_supported_markets(self, supported_markets):
         """测试获取支持的市场列表"""
-        markets = DataFetcherFactory.get_supported_markets()
-        assert 'a_share' in markets
-        assert 'us' in markets
-        assert 'hk' in markets
+        assert {'a_share', 'us', 'hk'} <= set(supported_markets)
 
 
 class TestAShareDataFetcher:
     """测试A股数据获取器"""
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def fetcher(self):
-        with patch('src.data_fetchers.a_share_fetcher.ak'):
-            return AShareDataFetcher()
+        return AShareDataFetcher()
     
     def test_initialization(self, fetcher):
         """测试初始化"""
@@ -95,27 +138,58 @@ class TestAShareDataFetcher:
         assert fetcher.get_market_name() == "A股"
         assert fetcher.get_market_emoji() == "🇨🇳"
     
-    def test_normalize_columns(self, fetcher):
-        """测试列名标准化"""
-        df = pd.DataFrame({
-            '名称': ['半导体', '白酒'],
-            '今日涨跌幅': [2.5, -1.2],
-            '今日主力净流入-净额': [100000000, -50000000]
-        })
+    @pytest.mark.parametrize("input_df, expected_cols", _NORMALIZE_CASES)
+    def test_normalize_columns(self, fetcher, input_df, expected_cols):
+        """测试列名标准化（带/不带"今日"前缀的akshare列名）"""
+        result = fetcher._normalize_columns(input_df)
+        
+        assert expected_cols.issubset(result.columns)
+    
+    @pytest.mark.parametrize("days, expected_len", [(5, 5), (30, 10)])
+    def test_get_sector_historical_days_limit(self, fetcher, mock_market_libs,
+                                              mock_historical_data, days, expected_len):
+        """测试历史数据按日期降序截取最近days天"""
+        mock_market_libs.ak.stock_sector_fund_flow_hist.return_value = mock_historical_data
         
-        result = fetcher._normalize_columns(df)
-        assert 'sector_name' in result.columns
-        assert 'change_pct' in result.columns
-        assert 'main_inflow' in result.columns
+        result = fetcher.get_sector_historical('半导体', days=days)
+        
+        assert len(result) == expected_len
+        assert result['date'].iloc[0] == '2024-02-14'
+        assert result['date'].is_monotonic_decreasing
+        assert (result['sector_name'] == '半导体').all()
+        # 原始数据不被修改
+        assert '日期' in mock_historical_data.columns
+    
+    def test_rate_limit(self, fetcher, monkeypatch):
+        """测试请求限速：用假时钟代替真实等待"""
+        fake_clock = [1000.0]
+        sleeps = []
+        
+        def fake_sleep(seconds):
+            sleeps.append(seconds)
+            fake_clock[0] += seconds
+        
+        # 只替换模块内引用的time，不影响全局time模块
+        monkeypatch.setattr('src.data_fetchers.a_share_fetcher.time',
+                            SimpleNamespace(time=lambda: fake_clock[0], sleep=fake_sleep))
+        
+        fetcher._rate_limit()
+        assert sleeps == []
+        assert fetcher._last_request_time == 1000.0
+        
+        # 间隔不足时补足剩余等待时间
+        fake_clock[0] += 0.2
+        fetcher._rate_limit()
+        assert sleeps == [pytest.approx(0.3)]
+        assert fetcher._last_request_time == pytest.approx(1000.5)
 
 
 class TestUSMarketDataFetcher:
     """测试美股数据获取器"""
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def fetcher(self):
-        with patch('src.data_fetchers.us_market_fetcher.yf'):
-            return USMarketDataFetcher()
+        return USMarketDataFetcher()
     
     def test_initialization(self, fetcher):
         """测试初始化"""
@@ -148,10 +222,9 @@ class TestUSMarketDataFetcher:
 class TestHKMarketDataFetcher:
     """测试港股数据获取器"""
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def fetcher(self):
-        with patch('src.data_fetchers.hk_market_fetcher.yf'):
-            return HKMarketDataFetcher(use_etfs=True)
+        return HKMarketDataFetcher(use_etfs=True)
     
     def test_initialization(self, fetcher):
         """测试初始化"""
@@ -163,7 +236,6 @@ class TestHKMarketDataFetcher:
     def test_get_etf_data_structure(self, fetcher):
         """测试港股ETF数据结构"""
         # 验证ETF配置存在
-        from src.data_fetchers.hk_market_fetcher import HK_SECTOR_ETFS
         assert '恒生科技' in HK_SECTOR_ETFS
         assert '3033.HK' in HK_SECTOR_ETFS.values()
 
@@ -178,6 +250,7 @@ class TestBaseDataFetcher:
         assert MarketType.HK.value == 'hk'
 
 
+@pytest.mark.integration
 class TestIntegration:
     """集成测试"""
     
@@ -191,17 +264,14 @@ class TestIntegration:
             for method in required_methods:
                 assert hasattr(fetcher_class, method), f"{fetcher_class.__name__} 缺少方法 {method}"
     
-    def test_all_markets_have_emoji(self):
-        """测试所有市场都有emoji"""
-        emojis = {
-            MarketType.A_SHARE: "🇨🇳",
-            MarketType.US: "🇺🇸",
-            MarketType.HK: "🇭🇰"
-        }
-        
-        for market_type, expected_emoji in emojis.items():
-            # 这里我们只是验证映射关系，不实际创建实例
-            pass  # emojis字典已经在代码中定义
+    @pytest.mark.parametrize("market,expected_emoji", [
+        ('a_share', "🇨🇳"),
+        ('us', "🇺🇸"),
+        ('hk', "🇭🇰"),
+    ])
+    def test_market_emoji(self, market, expected_emoji):
+        """测试通过工厂创建的各市场获取器emoji"""
+        assert DataFetcherFactory.create(market).get_market_emoji() == expected_emoji
 
 
 if __name__ == '__main__':
@@ -10,6 +10,38 @@ from src.analyzer import SectorAnalyzer
 from src.reporter import ReportGenerator
 
 
+# 测试只把这些数据交给mock或只读使用，模块内共享无需复制
+@pytest.fixture(scope="module")
+def sample_top10_df():
+    """通用板块排名样例数据"""
+    return pd.DataFrame({
+        'sector_name': ['Tech', 'Finance'],
+        'change_pct': [2.0, 1.5],
+        'main_inflow': [1000000, 800000],
+    })
+
+
+@pytest.fixture(scope="module")
+def sample_us_top10_df():
+    """美股ETF排名样例数据（带symbol列）"""
+    return pd.DataFrame({
+        'sector_name': ['XLK'],
+        'symbol': ['Technology'],
+        'change_pct': [1.5],
+        'main_inflow': [500000],
+    })
+
+
+@pytest.fixture(scope="module")
+def sample_a_share_df():
+    """A股板块样例数据（单位：分）"""
+    return pd.DataFrame({
+        'sector_name': ['半导体', '白酒'],
+        'change_pct': [2.5, -1.0],
+        'main_inflow': [500000000, -200000000],
+    })
+
+
 class TestMarketSchedule:
     """测试市场调度配置"""
     
@@ -25,18 +57,48 @@ class TestMarketSchedule:
         assert schedule.enabled is True
         assert schedule.schedule_time == '06:00'
         assert schedule.days_of_week == 'tue-sat'
+        assert (schedule.hour, schedule.minute) == (6, 0)
+    
+    @pytest.mark.parametrize("schedule_time", [
+        'invalid', '09:30:45', '09:30+08:00', '24:00', '09:60', '0930',
+    ])
+    def test_market_schedule_invalid_time(self, schedule_time):
+        """测试无效时间格式（含秒、时区等）在创建时即报错"""
+        with pytest.raises(ValueError):
+            MarketSchedule(
+                market='us',
+                enabled=True,
+                schedule_time=schedule_time,
+                days_of_week='tue-sat'
+            )
+    
+    @pytest.mark.parametrize("schedule_time,expected", [
+        ('9:30', ('09:30', 9, 30)),
+        ('09:30', ('09:30', 9, 30)),
+        (' 16:05 ', ('16:05', 16, 5)),
+    ])
+    def test_market_schedule_normalized_time(self, schedule_time, expected):
+        """测试一位数小时及首尾空白被规范化为 HH:MM"""
+        schedule = MarketSchedule(
+            market='us',
+            enabled=True,
+            schedule_time=schedule_time,
+            days_of_week='tue-sat'
+        )
+        assert (schedule.schedule_time, schedule.hour, schedule.minute) == expected
 
 
 class TestMultiMarketScheduler:
     """测试多市场调度器"""
     
     @pytest.fixture
-    def mock_components(self):
+    def mock_components(self, tmp_path):
         """创建模拟组件"""
-        analyzer = Mock(spec=SectorAnalyzer)
-        analyzer.data_path = './test_data'
+        analyzer = Mock()
+        # 快照写入各测试独立的临时目录，避免污染仓库及并行运行时互相覆盖
+        analyzer.data_path = str(tmp_path)
         
-        reporter = Mock(spec=ReportGenerator)
+        reporter = Mock()
         notifier = Mock()
         notion_writer = Mock()
         
@@ -58,6 +120,32 @@ class TestMultiMarketScheduler:
             output_mode='notion'
         )
     
+    @pytest.fixture(scope="class", autouse=True)
+    def _mock_factory_patch(self):
+        """类内只打一次 DataFetcherFactory 补丁，测试不会创建真实数据获取器"""
+        with patch('src.multi_market_scheduler.DataFetcherFactory') as factory:
+            yield factory
+    
+    @pytest.fixture
+    def mock_factory(self, _mock_factory_patch):
+        """每个测试拿到重置过的工厂mock"""
+        _mock_factory_patch.reset_mock(return_value=True, side_effect=True)
+        return _mock_factory_patch
+    
+    @pytest.fixture
+    def mocked_pipeline(self, scheduler, mock_components, mock_factory, sample_top10_df):
+        """配置好分析/报告mock和数据获取器的调度器，返回 (scheduler, fetcher)"""
+        analyzer = mock_components['analyzer']
+        analyzer.rank_by_inflow.return_value = sample_top10_df
+        analyzer.get_last_trading_date.return_value = '2024-01-01'
+        analyzer.detect_rotation.return_value = []
+        mock_components['reporter'].generate_summary.return_value = "Tech > Finance"
+        
+        mock_fetcher = Mock()
+        mock_fetcher.get_sector_data.return_value = sample_top10_df
+        mock_factory.create.return_value = mock_fetcher
+        return scheduler, mock_fetcher
+    
     def test_default_schedules(self):
         """测试默认调度配置"""
         schedules = MultiMarketScheduler.DEFAULT_SCHEDULES
@@ -74,72 +162,37 @@ class TestMultiMarketScheduler:
         assert schedules['hk'].schedule_time == '16:05'
         assert schedules['hk'].days_of_week == 'mon-fri'
     
-    @pytest.mark.asyncio
-    async def test_run_single_market_success(self, scheduler, mock_components):
+    async def test_run_single_market_success(self, mocked_pipeline):
         """测试运行单个市场成功"""
-        # 模拟数据
-        mock_df = pd.DataFrame({
-            'sector_name': ['Tech', 'Finance'],
-            'change_pct': [2.0, 1.5],
-            'main_inflow': [1000000, 800000],
-        })
+        scheduler, _ = mocked_pipeline
         
-        # 配置mock
-        mock_components['analyzer'].rank_by_inflow.return_value = mock_df
-        mock_components['analyzer'].get_last_trading_date.return_value = '2024-01-01'
-        mock_components['analyzer'].detect_rotation.return_value = []
-        mock_components['reporter'].generate_summary.return_value = "Tech > Finance"
-        
-        with patch('src.multi_market_scheduler.DataFetcherFactory') as mock_factory:
-            mock_fetcher = Mock()
-            mock_fetcher.get_sector_data.return_value = mock_df
-            mock_factory.create.return_value = mock_fetcher
-            
-            result = await scheduler.run_single_market('a_share')
+        result = await scheduler.run_single_market('a_share')
         
         assert result['market'] == 'a_share'
         assert result['success'] is True
         assert result['top10'] is not None
         assert len(result['rotation_signals']) == 0
     
-    @pytest.mark.asyncio
-    async def test_run_single_market_failure(self, scheduler, mock_components):
+    async def test_run_single_market_failure(self, scheduler, mock_factory):
         """测试运行单个市场失败"""
-        with patch('src.multi_market_scheduler.DataFetcherFactory') as mock_factory:
-            mock_fetcher = Mock()
-            mock_fetcher.get_sector_data.side_effect = Exception("网络错误")
-            mock_factory.create.return_value = mock_fetcher
-            
-            result = await scheduler.run_single_market('us')
+        mock_fetcher = Mock()
+        mock_fetcher.get_sector_data.side_effect = Exception("网络错误")
+        mock_factory.create.return_value = mock_fetcher
+        
+        result = await scheduler.run_single_market('us')
         
         assert result['market'] == 'us'
         assert result['success'] is False
         assert 'error' in result
         assert '网络错误' in result['error']
     
-    @pytest.mark.asyncio
-    async def test_run_all_markets(self, scheduler, mock_components):
+    async def test_run_all_markets(self, mocked_pipeline):
         """测试运行所有市场"""
-        mock_df = pd.DataFrame({
-            'sector_name': ['Sector1'],
-            'change_pct': [1.0],
-            'main_inflow': [1000000],
-        })
-        
-        mock_components['analyzer'].rank_by_inflow.return_value = mock_df
-        mock_components['analyzer'].get_last_trading_date.return_value = '2024-01-01'
-        mock_components['analyzer'].detect_rotation.return_value = []
-        mock_components['reporter'].generate_summary.return_value = "Sector1"
-        
+        scheduler, _ = mocked_pipeline
         # 禁用港股
         scheduler.schedules['hk'].enabled = False
         
-        with patch('src.multi_market_scheduler.DataFetcherFactory') as mock_factory:
-            mock_fetcher = Mock()
-            mock_fetcher.get_sector_data.return_value = mock_df
-            mock_factory.create.return_value = mock_fetcher
-            
-            results = await scheduler.run_all_markets()
+        results = await scheduler.run_all_markets()
         
         assert 'a_share' in results
         assert 'us' in results
@@ -148,27 +201,18 @@ class TestMultiMarketScheduler:
         assert results['us']['success'] is True
         assert results['hk'].get('skipped') is True  # 被跳过
     
-    @pytest.mark.asyncio
-    async def test_generate_multi_market_report(self, scheduler, mock_components):
+    async def test_generate_multi_market_report(self, scheduler, mock_components,
+                                                sample_top10_df, sample_us_top10_df):
         """测试生成多市场报告"""
         results = {
             'a_share': {
                 'success': True,
-                'top10': pd.DataFrame({
-                    'sector_name': ['Tech'],
-                    'change_pct': [2.0],
-                    'main_inflow': [1000000],
-                }),
+                'top10': sample_top10_df,
                 'rotation_signals': [],
             },
             'us': {
                 'success': True,
-                'top10': pd.DataFrame({
-                    'sector_name': ['XLK'],
-                    'symbol': ['Technology'],
-                    'change_pct': [1.5],
-                    'main_inflow': [500000],
-                }),
+                'top10': sample_us_top10_df,
                 'rotation_signals': [{'sector_name': 'XLK', 'yesterday_rank': 15}],
             },
         }
@@ -195,6 +239,7 @@ class TestMultiMarketScheduler:
         scheduler.update_schedule('hk', schedule_time='17:00', enabled=True)
         assert scheduler.schedules['hk'].schedule_time == '17:00'
         assert scheduler.schedules['hk'].enabled is True
+        assert scheduler.schedules['hk'].hour == 17
     
     def test_update_schedule_invalid_market(self, scheduler):
         """测试更新无效市场的调度配置"""
@@ -202,47 +247,69 @@ class TestMultiMarketScheduler:
             scheduler.update_schedule('invalid_market', schedule_time='10:00')
         assert "未知市场" in str(exc_info.value)
     
-    def test_get_last_trade_date_a_share(self, scheduler):
-        """测试获取A股上一个交易日"""
-        # 周二的上一个交易日是周一
-        result = scheduler._get_last_trade_date('a_share', '2024-01-09')
-        assert result == '2024-01-08'
+    def test_start_job_options(self, scheduler):
+        """测试定时任务合并错过的触发且不重叠运行"""
+        scheduler.scheduler = MagicMock()
+        scheduler.start()
+        
+        enabled = sum(1 for s in scheduler.schedules.values() if s.enabled)
+        assert scheduler.scheduler.add_job.call_count == enabled
+        call_kwargs = scheduler.scheduler.add_job.call_args.kwargs
+        assert call_kwargs['coalesce'] is True
+        assert call_kwargs['max_instances'] == 1
+        assert call_kwargs['misfire_grace_time'] == 3600
+        scheduler.scheduler.start.assert_called_once()
+    
+    @pytest.mark.parametrize("market,today,expected", [
+        ('a_share', '2024-01-09', '2024-01-08'),  # 周二的上一个交易日是周一
+        ('a_share', '2024-01-08', '2024-01-05'),  # 周一的上一个交易日是上周五
+        ('us', '2024-01-09', '2024-01-08'),
+        ('us', '2024-01-08', '2024-01-05'),       # 美股周一的上一个交易日是上周五
+    ])
+    def test_get_last_trade_date(self, scheduler, market, today, expected):
+        """测试获取上一个交易日"""
+        assert scheduler._get_last_trade_date(market, today) == expected
+    
+    def test_get_yesterday_top_caching(self, scheduler, mock_components):
+        """测试昨日排名按市场和日期缓存"""
+        mock_df = pd.DataFrame({'sector_name': ['Tech'], 'main_inflow': [1000000]})
+        mock_components['analyzer'].rank_by_inflow.return_value = mock_df
         
-        # 周一的上一个交易日是上周五
-        result = scheduler._get_last_trade_date('a_share', '2024-01-08')
-        assert result == '2024-01-05'
+        with patch.object(scheduler, '_load_market_snapshot', return_value=mock_df) as mock_load:
+            first = scheduler._get_yesterday_top('us', '2024-01-08')
+            second = scheduler._get_yesterday_top('us', '2024-01-08')
+        
+        mock_load.assert_called_once()
+        mock_components['analyzer'].rank_by_inflow.assert_called_once()
+        assert first is second
     
-    def test_get_last_trade_date_us(self, scheduler):
-        """测试获取美股上一个交易日"""
-        # 美股周二的上一个交易日是周一
-        result = scheduler._get_last_trade_date('us', '2024-01-09')
-        assert result == '2024-01-08'
+    def test_get_yesterday_top_missing_not_cached(self, scheduler):
+        """测试缺失的快照不被缓存"""
+        with patch.object(scheduler, '_load_market_snapshot', return_value=None) as mock_load:
+            assert scheduler._get_yesterday_top('us', '2024-01-08') is None
+            assert scheduler._get_yesterday_top('us', '2024-01-08') is None
         
-        # 美股周一的上一个交易日是上周五（美股周五收盘后）
-        result = scheduler._get_last_trade_date('us', '2024-01-08')
-        assert result == '2024-01-05'
+        assert mock_load.call_count == 2
     
-    def test_get_fetcher_caching(self, scheduler):
+    def test_get_fetcher_caching(self, scheduler, mock_factory):
         """测试数据获取器缓存"""
-        with patch('src.multi_market_scheduler.DataFetcherFactory') as mock_factory:
-            mock_fetcher = Mock()
-            mock_factory.create.return_value = mock_fetcher
-            
-            # 第一次获取
-            fetcher1 = scheduler._get_fetcher('a_share')
-            # 第二次获取（应该从缓存）
-            fetcher2 = scheduler._get_fetcher('a_share')
-            
-            # 验证工厂只被调用一次
-            mock_factory.create.assert_called_once()
-            assert fetcher1 is fetcher2
+        mock_factory.create.return_value = Mock()
+        
+        # 第一次获取
+        fetcher1 = scheduler._get_fetcher('a_share')
+        # 第二次获取（应该从缓存）
+        fetcher2 = scheduler._get_fetcher('a_share')
+        
+        # 验证工厂只被调用一次
+        mock_factory.create.assert_called_once()
+        assert fetcher1 is fetcher2
 
 
+@pytest.mark.integration
 class TestMultiMarketIntegration:
     """多市场集成测试"""
     
-    @pytest.mark.asyncio
-    async def test_full_workflow(self):
+    async def test_full_workflow(self, sample_a_share_df):
         """测试完整工作流程"""
         # 创建真实组件
         import tempfile
@@ -264,11 +331,7 @@ class TestMultiMarketIntegration:
             scheduler.schedules['a_share'].enabled = True
             
             # 模拟数据获取
-            mock_df = pd.DataFrame({
-                'sector_name': ['半导体', '白酒'],
-                'change_pct': [2.5, -1.0],
-                'main_inflow': [500000000, -200000000],
-            })
+            mock_df = sample_a_share_df
             
             with patch('src.multi_market_scheduler.DataFetcherFactory') as mock_factory:
                 mock_fetcher = Mock()
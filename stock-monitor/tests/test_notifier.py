@@ -3,112 +3,124 @@ import pytest
 import asyncio
 from unittest.mock import patch, AsyncMock, MagicMock
 from telegram.error import TelegramError, NetworkError
-from src.notifier import TelegramNotifier
+from src.notifier import TelegramNotifier, _split_markdown
+
+
+# 测试消息常量，模块导入时构建一次
+LONG_MESSAGE = "A" * 1000
+SPECIAL_MSG = "测试中文 🔥 和表情 📊 以及特殊字符 <>&"
 
 
 class TestTelegramNotifier:
     """TelegramNotifier通知器测试"""
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def notifier(self):
-        with patch('src.notifier.Bot') as MockBot:
-            mock_bot = MagicMock()
-            MockBot.return_value = mock_bot
+        """类内共享的通知器，send_message 桩只构建一次"""
+        with patch('src.notifier.Bot'):
             notifier = TelegramNotifier(
                 bot_token="test_token_12345",
                 chat_id="123456789"
             )
-            notifier.bot = mock_bot
+            notifier.bot = MagicMock()
+            notifier.bot.send_message = AsyncMock(return_value=MagicMock(message_id=123))
             yield notifier
     
-    @pytest.mark.asyncio
-    async def test_send_report_success(self, notifier):
+    @pytest.fixture(autouse=True)
+    def _reset(self, notifier):
+        """每个测试前清空调用记录和 side_effect，保留返回值"""
+        notifier.bot.send_message.reset_mock(side_effect=True)
+    
+    @pytest.fixture
+    def send_message_mock(self, notifier):
+        """bot.send_message 的AsyncMock，错误场景只需设置 side_effect"""
+        return notifier.bot.send_message
+    
+    async def test_send_report_success(self, notifier, send_message_mock):
         """测试发送消息成功"""
-        notifier.bot.send_message = AsyncMock(return_value=MagicMock(message_id=123))
-        
         result = await notifier.send_report("测试消息")
         
         assert result is True
-        notifier.bot.send_message.assert_called_once()
+        send_message_mock.assert_called_once()
         # 验证调用参数
-        call_args = notifier.bot.send_message.call_args
+        call_args = send_message_mock.call_args
         assert call_args.kwargs['chat_id'] == "123456789"
         assert call_args.kwargs['text'] == "测试消息"
     
-    @pytest.mark.asyncio
-    async def test_send_report_with_markdown(self, notifier):
+    async def test_send_report_with_markdown(self, notifier, send_message_mock):
         """测试发送Markdown格式消息"""
-        notifier.bot.send_message = AsyncMock(return_value=MagicMock(message_id=123))
         markdown_msg = "**粗体** 和 _斜体_"
         
         await notifier.send_report(markdown_msg)
         
-        notifier.bot.send_message.assert_called_once()
-        call_args = notifier.bot.send_message.call_args
+        send_message_mock.assert_called_once()
+        call_args = send_message_mock.call_args
         assert call_args.kwargs['parse_mode'] is not None
     
-    @pytest.mark.asyncio
-    async def test_send_report_network_error(self, notifier):
+    async def test_send_report_network_error(self, notifier, send_message_mock):
         """测试网络超时处理"""
-        notifier.bot.send_message = AsyncMock(side_effect=NetworkError("Connection timeout"))
+        send_message_mock.side_effect = NetworkError("Connection timeout")
         
         with pytest.raises(NetworkError):
             await notifier.send_report("测试消息")
     
-    @pytest.mark.asyncio
-    async def test_send_report_telegram_error(self, notifier):
+    async def test_send_report_telegram_error(self, notifier, send_message_mock):
         """测试Telegram API错误处理"""
-        notifier.bot.send_message = AsyncMock(side_effect=TelegramError("Invalid token"))
+        send_message_mock.side_effect = TelegramError("Invalid token")
         
         with pytest.raises(TelegramError):
             await notifier.send_report("测试消息")
     
-    @pytest.mark.asyncio
-    async def test_send_report_generic_error(self, notifier):
+    async def test_send_report_generic_error(self, notifier, send_message_mock):
         """测试一般错误处理"""
-        notifier.bot.send_message = AsyncMock(side_effect=Exception("Some unexpected error"))
+        send_message_mock.side_effect = Exception("Some unexpected error")
         
         result = await notifier.send_report("测试消息")
         
         # 一般错误返回False而不是抛出异常
         assert result is False
     
-    @pytest.mark.asyncio
-    async def test_send_test_message(self, notifier):
+    async def test_send_test_message(self, notifier, send_message_mock):
         """测试发送测试消息"""
-        notifier.bot.send_message = AsyncMock(return_value=MagicMock(message_id=123))
-        
         result = await notifier.send_test_message()
         
         assert result is True
-        notifier.bot.send_message.assert_called_once()
+        send_message_mock.assert_called_once()
         # 验证消息内容包含启动信息
-        call_args = notifier.bot.send_message.call_args
+        call_args = send_message_mock.call_args
         assert '已启动' in call_args.kwargs['text']
     
-    @pytest.mark.asyncio
-    async def test_send_long_message(self, notifier):
+    async def test_send_long_message(self, notifier, send_message_mock):
         """测试发送长消息"""
-        notifier.bot.send_message = AsyncMock(return_value=MagicMock(message_id=123))
-        long_message = "A" * 1000
-        
-        result = await notifier.send_report(long_message)
+        result = await notifier.send_report(LONG_MESSAGE)
         
         assert result is True
-        notifier.bot.send_message.assert_called_once()
+        send_message_mock.assert_called_once()
     
-    @pytest.mark.asyncio
-    async def test_send_message_with_special_chars(self, notifier):
+    async def test_send_message_with_special_chars(self, notifier, send_message_mock):
         """测试发送含特殊字符的消息"""
-        notifier.bot.send_message = AsyncMock(return_value=MagicMock(message_id=123))
-        special_msg = "测试中文 🔥 和表情 📊 以及特殊字符 <>&"
-        
-        result = await notifier.send_report(special_msg)
+        result = await notifier.send_report(SPECIAL_MSG)
         
         assert result is True
-        call_args = notifier.bot.send_message.call_args
+        call_args = send_message_mock.call_args
         assert call_args.kwargs['disable_web_page_preview'] is True
     
+    async def test_send_report_splits_long_message(self, notifier, send_message_mock):
+        """测试超长报告按段落分条发送"""
+        paragraphs = ["A" * 3000, "B" * 3000, "C" * 100]
+        
+        result = await notifier.send_report("\n\n".join(paragraphs))
+        
+        assert result is True
+        sent = [c.kwargs['text'] for c in send_message_mock.call_args_list]
+        assert sent == ["A" * 3000, "B" * 3000 + "\n\n" + "C" * 100]
+    
+    def test_split_markdown_hard_split(self):
+        """测试单段超长时按长度切分"""
+        chunks = _split_markdown("X" * 9000, limit=4000)
+        
+        assert [len(c) for c in chunks] == [4000, 4000, 1000]
+    
     def test_notifier_init(self):
         """测试初始化"""
         with patch('src.notifier.Bot') as MockBot:
@@ -123,10 +135,9 @@ class TestTelegramNotifier:
             assert notifier.chat_id == "987654321"
             assert notifier.bot is not None
     
-    @pytest.mark.asyncio
-    async def test_send_report_rate_limit(self, notifier):
+    async def test_send_report_rate_limit(self, notifier, send_message_mock):
         """测试速率限制错误"""
-        notifier.bot.send_message = AsyncMock(side_effect=TelegramError("Too Many Requests: retry after 30"))
+        send_message_mock.side_effect = TelegramError("Too Many Requests: retry after 30")
         
         with pytest.raises(TelegramError):
             await notifier.send_report("测试消息")
@@ -1,50 +1,80 @@
 """报告生成模块单元测试 - 多市场支持"""
+import importlib.util
+
 import pytest
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from unittest.mock import Mock
 
 from src.reporter import ReportGenerator
 
 
+# pytest-xdist --dist=loadgroup 时整个模块分到同一worker
+pytestmark = pytest.mark.xdist_group(name="reporter")
+
+# 测试用排名数据：各列预先定型为NumPy数组，构建时跳过逐值类型推断；测试只读使用
+_A_SHARE_TOP1 = pd.DataFrame({
+    'sector_name': np.array(['半导体'], dtype=object),
+    'change_pct': np.array([3.5], dtype=np.float64),
+    'main_inflow': np.array([500000000], dtype=np.int64),
+}, copy=False)
+
+_SECTION_TOP2 = pd.DataFrame({
+    'sector_name': np.array(['Sector1', 'Sector2'], dtype=object),
+    'symbol': np.array(['S1', 'S2'], dtype=object),
+    'change_pct': np.array([2.0, 1.5], dtype=np.float64),
+    'main_inflow': np.array([1000000, 800000], dtype=np.int64),
+}, copy=False)
+
+
+# multi_market_results 生成的综合报告应包含的内容（按在报告中出现的顺序）
+_MULTI_REPORT_EXPECTED = (
+    "# 📊 多市场板块监控",
+    # A股：TOP10排名及轮动信号
+    "🇨🇳 A股板块资金流向",
+    "### 🔥 TOP10 板块排名",
+    "半导体",
+    "### 🔄 轮动信号",
+    "光伏",
+    # 美股
+    "🇺🇸 美股板块表现",
+    "Technology",
+    # 港股
+    "🇭🇰 港股行业指数",
+    "恒生科技",
+    "恒生地产",
+)
+
+
+def _assert_in_order(report: str, needles) -> None:
+    """按顺序查找各片段，每次从上一个片段之后继续，整篇报告只扫描一遍"""
+    pos = 0
+    for needle in needles:
+        idx = report.find(needle, pos)
+        assert idx >= 0, f"报告缺少内容或顺序不符: {needle!r}"
+        pos = idx + len(needle)
+
+
+@pytest.fixture(scope="module")
+def reporter():
+    """模块内共享的报告生成器（无内部状态，测试只读使用）"""
+    return ReportGenerator()
+
+
 class TestReportGeneratorMultiMarket:
     """测试报告生成器的多市场功能"""
     
-    @pytest.fixture
-    def reporter(self):
-        return ReportGenerator()
-    
     def test_generate_multi_markdown(self, reporter, multi_market_results):
         """测试生成多市场综合报告"""
         report = reporter.generate_multi_markdown(multi_market_results)
         
-        # 验证报告包含所有市场
-        assert "# 📊 多市场板块监控" in report
-        assert "🇨🇳 A股板块资金流向" in report
-        assert "🇺🇸 美股板块表现" in report
-        assert "🇭🇰 港股行业指数" in report
-        
-        # 验证包含TOP10排名
-        assert "### 🔥 TOP10 排名" in report
-        assert "半导体" in report
-        assert "Technology" in report
-        assert "恒生科技" in report
-        
-        # 验证包含轮动信号
-        assert "### 🔄 轮动信号" in report
-        assert "光伏" in report
-        assert "恒生地产" in report
+        _assert_in_order(report, _MULTI_REPORT_EXPECTED)
     
     def test_generate_multi_markdown_partial_failure(self, reporter):
         """测试部分市场失败的报告生成"""
         results = {
             'a_share': {
                 'success': True,
-                'top10': pd.DataFrame({
-                    'sector_name': ['半导体'],
-                    'change_pct': [3.5],
-                    'main_inflow': [500000000],
-                }),
+                'top10': _A_SHARE_TOP1,
                 'rotation_signals': [],
             },
             'us': {
@@ -67,11 +97,7 @@ class TestReportGeneratorMultiMarket:
         results = {
             'a_share': {
                 'success': True,
-                'top10': pd.DataFrame({
-                    'sector_name': ['半导体'],
-                    'change_pct': [3.5],
-                    'main_inflow': [500000000],
-                }),
+                'top10': _A_SHARE_TOP1,
                 'rotation_signals': [],
             },
         }
@@ -84,42 +110,74 @@ class TestReportGeneratorMultiMarket:
         """测试生成单个市场章节"""
         result = {
             'success': True,
-            'top10': pd.DataFrame({
-                'sector_name': ['Sector1', 'Sector2'],
-                'symbol': ['S1', 'S2'],
-                'change_pct': [2.0, 1.5],
-                'main_inflow': [1000000, 800000],
-            }),
+            'top10': _SECTION_TOP2,
             'rotation_signals': [
                 {'sector_name': 'Sector1', 'yesterday_rank': 15}
             ],
         }
         
         lines = reporter._generate_market_section(result, "测试市场", "Test")
+        body = '\n'.join(lines)
         
         assert "## 测试市场" in lines
-        assert "Sector1" in '\n'.join(lines)
-        assert "Sector2" in '\n'.join(lines)
-        assert "昨日排名：#15" in '\n'.join(lines)
-    
-    def test_get_inflow_value(self, reporter):
-        """测试提取净流入值"""
-        # A股数据（单位是分）
-        a_share_row = {'main_inflow': 500000000}  # 5亿分 = 5亿元
-        assert reporter._get_inflow_value(a_share_row) == 5.0
-        
-        # 美股数据（较小值）
-        us_row = {'main_inflow': 1500000}  # 被当作每股价格*股数，转换后较小
-        result = reporter._get_inflow_value(us_row)
-        assert result < 1.0
-        
-        # 带symbol字段的美股数据
-        us_row_with_symbol = {
-            'main_inflow': 1500000,
-            'symbol': 'XLK'
-        }
-        result = reporter._get_inflow_value(us_row_with_symbol)
-        assert result is not None
+        assert "Sector1" in body
+        assert "Sector2" in body
+        assert "昨日排名：#15" in body
+    
+    def test_attach_inflow_column(self, reporter):
+        """测试计算净流入列"""
+        df = pd.DataFrame({
+            # A股数据（单位是分）、美股数据（较小值）、缺失值回退到下一列
+            'main_inflow': [500000000, 1500000, None, 0],
+            'super_large_inflow': [1, 2, 300000000, None],
+        })
+        result = reporter._attach_inflow_column(df)
+        
+        assert list(result['inflow_yi']) == pytest.approx([5.0, 0.015, 3.0, 0.0])
+        assert 'inflow_yi' not in df.columns
+    
+    def test_calculate_total_inflow(self, reporter):
+        """测试资金流向统计（单位：分 -> 亿元）"""
+        df = pd.DataFrame({
+            'main_inflow': [7e8, 6e8, 5e8, 4e8, 3e8, 2e8, 1e8, 0, None, -2e8, -3e8],
+        })
+        stats = reporter._calculate_total_inflow(df, 'a_share')
+        
+        assert stats['total_inflow'] == pytest.approx(28.0)
+        assert stats['total_outflow'] == pytest.approx(-5.0)
+        assert stats['net_flow'] == pytest.approx(23.0)
+        assert stats['inflow_sectors'] == 7
+        assert stats['outflow_sectors'] == 2
+        assert stats['top5_inflow'] == pytest.approx(25.0)
+    
+    def test_analyze_market_flow_outflow(self, reporter):
+        """测试净流出市场的分析文本"""
+        df = pd.DataFrame({'main_inflow': [1e8, -3e8]})
+        text = reporter._analyze_market_flow(df, 'A股')
+        
+        assert text.startswith("🔴 **整体流向**: 📉 **资金净流出**")
+        assert "| 资金净流出总额 | -3.00 亿 |" in text
+        assert text.endswith("**净流向**: -2.00 亿")
+    
+    def test_rotation_rank_format(self, reporter):
+        """测试轮动信号排名格式（numpy整数同样加#）"""
+        rotation = [
+            {'sector_name': 'A', 'yesterday_rank': np.int64(12)},
+            {'sector_name': 'B', 'yesterday_rank': '>10'},
+        ]
+        report = reporter.generate_markdown(pd.DataFrame(), rotation)
+        
+        assert "- A（昨日排名：#12）" in report
+        assert "- B（昨日排名：>10）" in report
+    
+    def test_analyze_market_flow_without_inflow_column(self, reporter):
+        """测试缺少净流入列时返回None，报告中省略资金流向章节"""
+        df = pd.DataFrame({'sector_name': ['XLK'], 'change_pct': [1.2]})
+        assert reporter._analyze_market_flow(df, '美股') is None
+        
+        result = {'success': True, 'top10': df, 'rotation_signals': [], 'full_data': df}
+        section = reporter._generate_market_section(result, "美股", "美股")
+        assert "### 💰 资金流向分析" not in section
     
     def test_generate_market_summary(self, reporter, multi_market_results):
         """测试生成多市场摘要"""
@@ -146,10 +204,6 @@ class TestReportGeneratorMultiMarket:
 class TestReportGeneratorBackwardCompatibility:
     """测试报告生成器的向后兼容性"""
     
-    @pytest.fixture
-    def reporter(self):
-        return ReportGenerator()
-    
     def test_generate_markdown(self, reporter, mock_sector_data, sample_rotation_signals):
         """测试旧的单市场报告生成"""
         report = reporter.generate_markdown(mock_sector_data, sample_rotation_signals)
@@ -183,5 +237,19 @@ class TestReportGeneratorBackwardCompatibility:
         assert summary == "无数据"
 
 
+
+@pytest.mark.bench
+@pytest.mark.skipif(importlib.util.find_spec("pytest_benchmark") is None,
+                    reason="需要 pytest-benchmark")
+class TestReportGeneratorBenchmark:
+    """报告生成性能基准（数据准备不计时，只测量报告渲染）"""
+    
+    def test_generate_multi_markdown_bench(self, benchmark, multi_market_results):
+        """测量多市场报告渲染耗时"""
+        reporter = ReportGenerator()
+        report = benchmark(reporter.generate_multi_markdown, multi_market_results)
+        
+        assert "半导体" in report
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -1,12 +1,41 @@
 """MonitorScheduler模块测试"""
 import pytest
 import asyncio
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from unittest.mock import MagicMock, AsyncMock, patch, ANY
 from src.scheduler import MonitorScheduler
 
 
+# pytest-xdist --dist=loadgroup 时整个模块分到同一worker
+pytestmark = pytest.mark.xdist_group(name="scheduler")
+
+_MOCK_DATA = pd.DataFrame({
+    'sector_name': np.array(['A', 'B'], dtype=object),
+    'main_inflow': np.array([100, 90], dtype=np.int64),
+}, copy=False)
+
+# run_once 场景：数据获取/昨日快照/轮动信号/通知发送的组合及期望结果
+_RUN_ONCE_CASES = [
+    pytest.param({'has_yesterday': True, 'expected': True, 'rotation_checked': True},
+                 id="success"),
+    pytest.param({'fetch_error': Exception("API Error"), 'has_yesterday': True,
+                  'expected': False, 'rotation_checked': False},
+                 id="fetch_error"),
+    # 无昨日数据时应该跳过轮动检测
+    pytest.param({'has_yesterday': False, 'expected': True, 'rotation_checked': False},
+                 id="no_yesterday_data"),
+    pytest.param({'has_yesterday': True, 'rotation_signals': [{'sector_name': 'B', 'yesterday_rank': 15}],
+                  'expected': True, 'rotation_checked': True},
+                 id="rotation_detected"),
+    # 通知错误应该导致整体失败
+    pytest.param({'notify_error': Exception("Network error"), 'has_yesterday': False,
+                  'expected': False, 'rotation_checked': False},
+                 id="notifier_error"),
+]
+
+
 class TestMonitorScheduler:
     """MonitorScheduler调度器测试"""
     
@@ -21,121 +50,63 @@ class TestMonitorScheduler:
             output_mode="telegram"
         )
     
-    @pytest.mark.asyncio
-    async def test_run_once_success(self, scheduler, mock_scheduler_components):
-        """测试单次运行成功"""
-        # 设置mock返回值
-        mock_data = pd.DataFrame({'sector_name': ['A'], 'main_inflow': [100]})
-        mock_scheduler_components['data_fetcher'].get_sector_data.return_value = mock_data
-        mock_scheduler_components['analyzer'].rank_by_inflow.return_value = mock_data
-        mock_scheduler_components['analyzer'].get_last_trading_date.return_value = '2024-02-14'
-        mock_scheduler_components['analyzer'].load_snapshot.return_value = mock_data
-        mock_scheduler_components['analyzer'].detect_rotation.return_value = []
-        mock_scheduler_components['reporter'].generate_markdown.return_value = "测试报告"
-        mock_scheduler_components['reporter'].generate_summary.return_value = "A"
-        mock_scheduler_components['notifier'].send_report = AsyncMock(return_value=True)
-        
-        result = await scheduler.run_once()
-        
-        assert result is True
-        # 验证各组件被正确调用
-        mock_scheduler_components['data_fetcher'].get_sector_data.assert_called_once()
-        mock_scheduler_components['analyzer'].rank_by_inflow.assert_called()
-        mock_scheduler_components['analyzer'].save_snapshot.assert_called_once()
-        mock_scheduler_components['notifier'].send_report.assert_called()
-    
-    @pytest.mark.asyncio
-    async def test_run_once_data_fetch_error(self, scheduler, mock_scheduler_components):
-        """测试数据获取失败"""
-        mock_scheduler_components['data_fetcher'].get_sector_data.side_effect = Exception("API Error")
-        mock_scheduler_components['notifier'].send_report = AsyncMock(return_value=True)
-        
-        result = await scheduler.run_once()
-        
-        assert result is False
-        mock_scheduler_components['notifier'].send_report.assert_called_once()
-        # 验证错误消息被发送
-        call_args = mock_scheduler_components['notifier'].send_report.call_args
-        assert '失败' in call_args[0][0] or '错误' in call_args[0][0]
-    
-    @pytest.mark.asyncio
-    async def test_run_once_no_yesterday_data(self, scheduler, mock_scheduler_components):
-        """测试无昨日数据的情况"""
-        mock_data = pd.DataFrame({'sector_name': ['A'], 'main_inflow': [100]})
-        mock_scheduler_components['data_fetcher'].get_sector_data.return_value = mock_data
-        mock_scheduler_components['analyzer'].rank_by_inflow.return_value = mock_data
-        mock_scheduler_components['analyzer'].get_last_trading_date.return_value = '2024-02-14'
-        mock_scheduler_components['analyzer'].load_snapshot.return_value = None  # 无昨日数据
-        mock_scheduler_components['reporter'].generate_markdown.return_value = "测试报告"
-        mock_scheduler_components['reporter'].generate_summary.return_value = "A"
-        mock_scheduler_components['notifier'].send_report = AsyncMock(return_value=True)
-        
-        result = await scheduler.run_once()
-        
-        assert result is True
-        # 应该跳过轮动检测
-        mock_scheduler_components['analyzer'].detect_rotation.assert_not_called()
-    
-    @pytest.mark.asyncio
-    async def test_run_once_rotation_detected(self, scheduler, mock_scheduler_components):
-        """测试检测到轮动信号"""
-        mock_data = pd.DataFrame({'sector_name': ['A', 'B'], 'main_inflow': [100, 90]})
-        rotation_signals = [{'sector_name': 'B', 'yesterday_rank': 15}]
-        
-        mock_scheduler_components['data_fetcher'].get_sector_data.return_value = mock_data
-        mock_scheduler_components['analyzer'].rank_by_inflow.return_value = mock_data
-        mock_scheduler_components['analyzer'].get_last_trading_date.return_value = '2024-02-14'
-        mock_scheduler_components['analyzer'].load_snapshot.return_value = mock_data
-        mock_scheduler_components['analyzer'].detect_rotation.return_value = rotation_signals
-        mock_scheduler_components['reporter'].generate_markdown.return_value = "测试报告"
-        mock_scheduler_components['reporter'].generate_summary.return_value = "A"
-        mock_scheduler_components['notifier'].send_report = AsyncMock(return_value=True)
+    @pytest.mark.parametrize("scenario", _RUN_ONCE_CASES)
+    async def test_run_once(self, scenario, scheduler, mock_scheduler_components):
+        """测试单次运行的各种场景"""
+        data_fetcher = mock_scheduler_components['data_fetcher']
+        analyzer = mock_scheduler_components['analyzer']
+        reporter = mock_scheduler_components['reporter']
+        notifier = mock_scheduler_components['notifier']
+        
+        data_fetcher.get_sector_data.return_value = _MOCK_DATA
+        data_fetcher.get_sector_data.side_effect = scenario.get('fetch_error')
+        analyzer.rank_by_inflow.return_value = _MOCK_DATA
+        analyzer.get_last_trading_date.return_value = '2024-02-14'
+        analyzer.load_snapshot.return_value = _MOCK_DATA if scenario['has_yesterday'] else None
+        analyzer.detect_rotation.return_value = scenario.get('rotation_signals', [])
+        reporter.generate_markdown.return_value = "测试报告"
+        reporter.generate_summary.return_value = "A"
+        # 通过 side_effect 记录发送的消息
+        sent = []
+        
+        async def capture(message, *args, **kwargs):
+            sent.append(message)
+            if scenario.get('notify_error'):
+                raise scenario['notify_error']
+            return True
+        
+        notifier.send_report.side_effect = capture
         
         result = await scheduler.run_once()
         
-        assert result is True
-        mock_scheduler_components['analyzer'].detect_rotation.assert_called_once()
+        assert result is scenario['expected']
+        assert sent
+        assert analyzer.detect_rotation.called is scenario['rotation_checked']
+        if scenario.get('fetch_error'):
+            # 验证错误消息被发送
+            assert len(sent) == 1
+            assert '失败' in sent[0] or '错误' in sent[0]
+        elif scenario['expected']:
+            data_fetcher.get_sector_data.assert_called_once()
+            analyzer.save_snapshot.assert_called_once()
     
-    def test_scheduler_init_default_time(self, mock_scheduler_components):
-        """测试默认时间初始化"""
-        scheduler = MonitorScheduler(
-            data_fetcher=mock_scheduler_components['data_fetcher'],
-            analyzer=mock_scheduler_components['analyzer'],
-            reporter=mock_scheduler_components['reporter'],
-            notifier=mock_scheduler_components['notifier']
-        )
-        
-        assert scheduler.schedule_time == "15:05"
-        assert scheduler.schedule_hour == 15
-        assert scheduler.schedule_minute == 5
-    
-    def test_scheduler_init_custom_time(self, mock_scheduler_components):
-        """测试自定义时间初始化"""
+    @pytest.mark.parametrize("schedule_time,expected", [
+        (None, ("15:05", 15, 5)),        # 默认时间
+        ("09:30", ("09:30", 9, 30)),     # 自定义时间
+        ("invalid", ("invalid", 15, 5)), # 无效格式回退到默认值
+    ])
+    def test_scheduler_init(self, mock_scheduler_components, schedule_time, expected):
+        """测试调度时间初始化"""
+        kwargs = {} if schedule_time is None else {'schedule_time': schedule_time}
         scheduler = MonitorScheduler(
             data_fetcher=mock_scheduler_components['data_fetcher'],
             analyzer=mock_scheduler_components['analyzer'],
             reporter=mock_scheduler_components['reporter'],
             notifier=mock_scheduler_components['notifier'],
-            schedule_time="09:30"
+            **kwargs
         )
         
-        assert scheduler.schedule_time == "09:30"
-        assert scheduler.schedule_hour == 9
-        assert scheduler.schedule_minute == 30
-    
-    def test_scheduler_init_invalid_time(self, mock_scheduler_components):
-        """测试无效时间格式初始化"""
-        scheduler = MonitorScheduler(
-            data_fetcher=mock_scheduler_components['data_fetcher'],
-            analyzer=mock_scheduler_components['analyzer'],
-            reporter=mock_scheduler_components['reporter'],
-            notifier=mock_scheduler_components['notifier'],
-            schedule_time="invalid"
-        )
-        
-        # 应该回退到默认值
-        assert scheduler.schedule_hour == 15
-        assert scheduler.schedule_minute == 5
+        assert (scheduler.schedule_time, scheduler.schedule_hour, scheduler.schedule_minute) == expected
     
     @patch('src.scheduler.AsyncIOScheduler')
     def test_start_scheduler(self, mock_scheduler_class, scheduler):
@@ -166,19 +137,41 @@ class TestMonitorScheduler:
         
         mock_scheduler_instance.shutdown.assert_called_once()
     
-    @pytest.mark.asyncio
-    async def test_run_once_notifier_error(self, scheduler, mock_scheduler_components):
-        """测试通知发送失败"""
-        mock_data = pd.DataFrame({'sector_name': ['A'], 'main_inflow': [100]})
-        mock_scheduler_components['data_fetcher'].get_sector_data.return_value = mock_data
-        mock_scheduler_components['analyzer'].rank_by_inflow.return_value = mock_data
-        mock_scheduler_components['analyzer'].get_last_trading_date.return_value = '2024-02-14'
+    async def test_run_once_closes_image_uploader(self, scheduler, mock_scheduler_components):
+        """测试图表上传失败时也会关闭图床的aiohttp会话"""
+        mock_scheduler_components['data_fetcher'].get_sector_data.return_value = _MOCK_DATA
+        mock_scheduler_components['analyzer'].rank_by_inflow.return_value = _MOCK_DATA
         mock_scheduler_components['analyzer'].load_snapshot.return_value = None
-        mock_scheduler_components['reporter'].generate_markdown.return_value = "测试报告"
-        mock_scheduler_components['reporter'].generate_summary.return_value = "A"
-        mock_scheduler_components['notifier'].send_report = AsyncMock(side_effect=Exception("Network error"))
+        scheduler.chart_generator = MagicMock()
+        scheduler.image_uploader = MagicMock(
+            upload_many=AsyncMock(side_effect=Exception("upload error")),
+            aclose=AsyncMock(),
+        )
         
-        # 通知错误应该导致整体失败
-        result = await scheduler.run_once()
+        with patch.object(scheduler, '_generate_charts', return_value=['trend.png']):
+            assert await scheduler.run_once() is False
+        
+        scheduler.image_uploader.aclose.assert_awaited_once()
+    
+    def test_generate_charts(self, scheduler):
+        """测试生成图表：跳过失败的图表并清理旧文件"""
+        scheduler.chart_generator = MagicMock()
+        scheduler.chart_generator.generate_top_sectors_trend.return_value = 'trend.png'
+        scheduler.chart_generator.generate_market_heatmap.return_value = None
+        
+        assert scheduler._generate_charts() == ['trend.png']
+        scheduler.chart_generator.cleanup_old_charts.assert_called_once_with(keep_days=7)
+        
+        scheduler.chart_generator.generate_top_sectors_trend.side_effect = Exception("matplotlib error")
+        assert scheduler._generate_charts() == []
+    
+    async def test_dispatch_report_failure_does_not_block_other(self, scheduler, mock_scheduler_components):
+        """测试并发发送：Telegram失败不影响Notion写入"""
+        scheduler.output_mode = "both"
+        scheduler.notion_writer = MagicMock()
+        mock_scheduler_components['notifier'].send_report.side_effect = Exception("Network error")
+        
+        results = await scheduler._dispatch_report("标题", "报告", chart_files=[])
         
-        assert result is False
+        assert isinstance(results[0], Exception)
+        scheduler.notion_writer.write_report.assert_called_once_with("标题", "报告", chart_files=[])